@@ -2,6 +2,7 @@ from flask import Flask, send_from_directory, abort
 
 import os
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 from config import Config
 from database.init_db import init_db
 from routes import main_routes
@@ -12,6 +13,11 @@ app.config.from_object(Config)
 # Enable CORS
 CORS(app)
 
+# Take the client address from the trusted reverse proxy (IIS) headers
+if app.config['TRUSTED_PROXY_HOPS']:
+    # Only the client address: scheme and host forwarding aren't needed here
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['TRUSTED_PROXY_HOPS'], x_proto=0)
+
 # Initialize the database
 init_db(app)
 
@@ -43,6 +49,7 @@ def get_image(filepath):
         return abort(404)  # Not Found
 
 if __name__ == '__main__':
+    # Development server only; production runs `python serve.py` or gunicorn (see wsgi.py)
     # app.run(host='0.0.0.0', port=5000, ssl_context=("server.crt", "server.key"))
     app.run(host='0.0.0.0', port=6000, debug=True)
     # app.run(debug=True)
@@ -0,0 +1,154 @@
+"""Synthetic, deterministic fixtures for the benchmark suite.
+
+Everything is generated locally: multi-page PDFs with an embedded CJK text
+layer, image-only "scanned" PDFs, PNG page scans, DOCX files with page breaks
+and database rows for a corpus of a given size.
+"""
+import random
+import zipfile
+
+# Mixed Japanese / Traditional Chinese vocabulary for page text
+VOCABULARY = (
+    "日本 漢文 書簡 記録 注釈 翻訳 史料 寺院 幕府 使節 朝鮮 琉球 長崎 "
+    "臺灣 書院 經典 詩文 禮記 論語 學問 商人 貿易 航海 天文 暦法 醫術"
+).split()
+
+# Word the search benchmarks look for; seeded into a fraction of pages
+KEYWORD = "朱印状"
+
+W_NAMESPACE = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+
+
+def cjk_text(rng, length):
+    """Return roughly `length` characters of CJK text."""
+    words = []
+    size = 0
+    while size < length:
+        word = rng.choice(VOCABULARY)
+        words.append(word)
+        size += len(word)
+    return "".join(words)
+
+
+def page_text(rng, length=1200, keyword_rate=0.2):
+    """Page-sized text that contains KEYWORD on about `keyword_rate` of pages."""
+    text = cjk_text(rng, length)
+    if rng.random() < keyword_rate:
+        position = rng.randrange(len(text))
+        text = text[:position] + KEYWORD + text[position:]
+    return text
+
+
+def write_text_pdf(path, pages=10, seed=0):
+    """Born-digital PDF: every page has an embedded CJK text layer."""
+    import fitz
+    rng = random.Random(seed)
+    with fitz.open() as doc:
+        for _ in range(pages):
+            page = doc.new_page()
+            text = page_text(rng, 600)
+            # 30 characters per line so the text stays on the page
+            lines = [text[i:i + 30] for i in range(0, len(text), 30)]
+            page.insert_text((40, 60), "\n".join(lines), fontname='japan', fontsize=14)
+        doc.save(path)
+    return path
+
+
+def write_scan_image(path, seed=0, size=(1240, 1754)):
+    """A grey, noisy A4-at-150dpi page image standing in for a scan."""
+    from PIL import Image, ImageDraw
+    rng = random.Random(seed)
+    image = Image.new('RGB', size, (235, 232, 225))
+    draw = ImageDraw.Draw(image)
+    # Vertical "columns" of marks, like a vertically set page
+    for x in range(size[0] - 120, 80, -60):
+        y = 100
+        while y < size[1] - 100:
+            height = rng.randint(20, 34)
+            draw.rectangle((x, y, x + 28, y + height), fill=(40, 38, 35))
+            y += height + rng.randint(6, 14)
+    image.save(path)
+    return path
+
+
+def write_scan_pdf(path, image_path, pages=10):
+    """Image-only PDF (no text layer) built from a scan image."""
+    import fitz
+    with fitz.open() as doc:
+        for _ in range(pages):
+            page = doc.new_page()
+            page.insert_image(page.rect, filename=image_path)
+        doc.save(path)
+    return path
+
+
+def write_docx(path, pages=10, paragraphs_per_page=20, seed=0):
+    """Minimal DOCX whose pages are separated by explicit page breaks."""
+    rng = random.Random(seed)
+    body = []
+    for page in range(pages):
+        for paragraph in range(paragraphs_per_page):
+            run = f'<w:r><w:t>{cjk_text(rng, 60)}</w:t></w:r>'
+            if page and not paragraph:
+                run = '<w:r><w:br w:type="page"/></w:r>' + run
+            body.append(f'<w:p>{run}</w:p>')
+    document = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        f'<w:document xmlns:w="{W_NAMESPACE}"><w:body>{"".join(body)}<w:sectPr/></w:body></w:document>'
+    )
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/word/document.xml" ContentType="application/'
+            'vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+            '</Types>'
+        ))
+        archive.writestr('_rels/.rels', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/'
+            'relationships/officeDocument" Target="word/document.xml"/>'
+            '</Relationships>'
+        ))
+        archive.writestr('word/document.xml', document)
+    return path
+
+
+def populate_corpus(db, documents, pages_per_document=10, annotations_per_page=2, seed=0):
+    """Insert a synthetic corpus and return the id of its admin user."""
+    from models import Annotation, Document, Page, Thumbnail, User
+    rng = random.Random(seed)
+
+    user = User(username='bench', email='bench@example.com', role='admin', is_active=True)
+    user.set_password('bench')
+    db.session.add(user)
+    db.session.flush()
+
+    for number in range(documents):
+        document = Document(
+            title=f"document-{number}.pdf", type='1',
+            file_path=f"/nonexistent/document-{number}.pdf", user_id=user.id
+        )
+        db.session.add(document)
+        db.session.flush()
+        for page_number in range(1, pages_per_document + 1):
+            page = Page(
+                document_id=document.id, page_number=page_number,
+                text=page_text(rng), jp_translation=page_text(rng, keyword_rate=0.05)
+            )
+            db.session.add(page)
+            db.session.add(Thumbnail(
+                document_id=document.id, page_number=page_number,
+                image_path=f"/nonexistent/{number}/{page_number}.jpg"
+            ))
+            db.session.flush()
+            for _ in range(annotations_per_page):
+                db.session.add(Annotation(
+                    page_id=page.id, target_text=cjk_text(rng, 4),
+                    type="注釈", content=page_text(rng, 200, keyword_rate=0.1)
+                ))
+        db.session.commit()
+    return user.id
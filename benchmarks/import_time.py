@@ -0,0 +1,70 @@
+"""Measure `import app` with `python -X importtime` and check it against a budget.
+
+Usage: python benchmarks/import_time.py [--budget-ms 800] [--runs 5]
+
+Exits non-zero when the median import time exceeds the budget or when any
+OCR/imaging module is pulled in at import time.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must only load once the ingestion path runs
+HEAVY_MODULES = ('PIL', 'pytesseract', 'fitz', 'pdf2image', 'docx', 'PyPDF2')
+
+
+def measure_once():
+    """Return (cumulative microseconds for `app`, set of imported top-level modules)."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import app'],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    total_us = None
+    modules = set()
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        parts = [p.strip() for p in line[len('import time:'):].split('|')]
+        if not parts[1].isdigit():
+            continue  # header line
+        name = parts[2].strip()
+        modules.add(name.split('.')[0])
+        if name == 'app':
+            total_us = int(parts[1])
+    return total_us, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--budget-ms', type=float, default=float(os.environ.get('IMPORT_BUDGET_MS') or 800))
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    timings = []
+    loaded_heavy = set()
+    for _ in range(args.runs):
+        total_us, modules = measure_once()
+        timings.append(total_us / 1000)
+        loaded_heavy |= modules.intersection(HEAVY_MODULES)
+
+    median_ms = statistics.median(timings)
+    print(f"import app: median {median_ms:.1f} ms, min {min(timings):.1f} ms "
+          f"over {args.runs} runs (budget {args.budget_ms:.0f} ms)")
+
+    failed = False
+    if loaded_heavy:
+        print(f"FAIL: heavy modules imported at startup: {', '.join(sorted(loaded_heavy))}")
+        failed = True
+    if median_ms > args.budget_ms:
+        print("FAIL: import time over budget")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
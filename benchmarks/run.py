@@ -0,0 +1,239 @@
+"""End-to-end benchmarks for ingestion, search and the read/edit endpoints.
+
+Runs offline against a throwaway SQLite database and synthetic fixtures
+(see fixtures.py), and writes a JSON report that can be compared between runs.
+
+Usage:
+    python benchmarks/run.py --sizes 10,100,500 --output bench.json
+    python benchmarks/run.py --output new.json --compare bench.json --threshold 0.2
+
+With --compare the exit status is non-zero if any benchmark's median got
+slower than the baseline by more than --threshold (a fraction).
+Benchmarks whose external tools are missing (poppler for PDF thumbnails,
+Tesseract for OCR) are reported as skipped.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORKDIR = tempfile.mkdtemp(prefix='ocr-bench-')
+
+# Must be set before config.py is imported
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(WORKDIR, 'bench.db')}"
+sys.path.insert(0, ROOT)
+
+import fixtures  # noqa: E402
+
+
+def timed(function, repeat):
+    """Run `function` `repeat` times and return timing statistics in seconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - start)
+    return {
+        "runs": repeat,
+        "median_s": statistics.median(samples),
+        "min_s": min(samples),
+        "mean_s": statistics.fmean(samples),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def find_tools(utils):
+    """Point utils at poppler and Tesseract, trying PATH when the configured
+    (Windows) locations don't exist. Returns True if poppler was found;
+    utils.TESSERACT_CMD is left as None if Tesseract wasn't."""
+    if not os.path.exists(utils.TESSERACT_CMD):
+        utils.TESSERACT_CMD = shutil.which('tesseract')
+    if not os.path.isdir(utils.POPPLER_PATH):
+        pdftoppm = shutil.which('pdftoppm')
+        if pdftoppm is None:
+            return False
+        utils.POPPLER_PATH = os.path.dirname(pdftoppm)
+    return True
+
+
+def ingestion_benchmarks(app, args, results):
+    """extract_text and process_thumbnails on generated PDF, scan and DOCX files."""
+    import utils
+    from models import db, Thumbnail
+
+    # Thumbnails go to the scratch directory, not the repository's storage/
+    utils.STORAGE_PATH = os.path.join(WORKDIR, 'storage')
+    files = os.path.join(WORKDIR, 'files')
+    os.makedirs(files, exist_ok=True)
+
+    scan = fixtures.write_scan_image(os.path.join(files, 'scan.png'))
+    inputs = {
+        'text_pdf': fixtures.write_text_pdf(os.path.join(files, 'text.pdf'), pages=args.pages),
+        'scan_pdf': fixtures.write_scan_pdf(os.path.join(files, 'scan.pdf'), scan, pages=args.pages),
+        'scan_image': scan,
+        'docx': fixtures.write_docx(os.path.join(files, 'manuscript.docx'), pages=args.pages),
+    }
+    has_poppler = find_tools(utils)
+    has_tesseract = utils.TESSERACT_CMD is not None
+
+    for name, path in inputs.items():
+        key = f"extract_text[{name}]"
+        if name.startswith('scan') and not has_tesseract:
+            results[key] = {"skipped": "tesseract not found"}
+        else:
+            results[key] = timed(lambda: utils.extract_text(1, path), args.repeat)
+
+    with app.app_context():
+        for name in ('text_pdf', 'scan_image'):
+            key = f"process_thumbnails[{name}]"
+            path = inputs[name]
+            if path.endswith('.pdf') and not has_poppler:
+                results[key] = {"skipped": "poppler not found"}
+                continue
+
+            def run():
+                Thumbnail.query.filter_by(document_id=1).delete()
+                utils.process_thumbnails(path, 1)
+            results[key] = timed(run, args.repeat)
+        db.session.rollback()
+
+
+def corpus_benchmarks(app, size, args, results):
+    """search_by_keyword and the read/edit endpoints over a corpus of `size` documents."""
+    import utils
+    from models import db, Document, Page, User
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        user_id = fixtures.populate_corpus(db, size, pages_per_document=args.pages)
+        user = db.session.get(User, user_id)
+        token = user.generate_token(app.config['SECRET_KEY'])
+        document_id = db.session.query(Document.id).order_by(Document.id).first()[0]
+        page_id = db.session.query(Page.id).filter_by(document_id=document_id).first()[0]
+
+        results[f"search_by_keyword[{size}]"] = timed(
+            lambda: utils.search_by_keyword(fixtures.KEYWORD), args.repeat
+        )
+        db.session.remove()
+
+    client = app.test_client()
+    headers = {'Authorization': f"Bearer {token}"}
+
+    def get(url):
+        response = client.get(url)
+        assert response.status_code == 200, (url, response.status_code)
+
+    edits = itertools.count()
+
+    def edit():
+        # New text every run: /doc-edit skips the write when nothing changed
+        response = client.put(f"/doc-edit/{document_id}", headers=headers, json={
+            "pages": [{"id": page_id, "text": f"{fixtures.page_text(random.Random(0))} {next(edits)}"}]
+        })
+        assert response.status_code == 200, response.status_code
+
+    results[f"/search[{size}]"] = timed(lambda: get(f"/search?keyword={fixtures.KEYWORD}"), args.repeat)
+    results[f"/doc-list[{size}]"] = timed(lambda: get('/doc-list?type=1'), args.repeat)
+    results[f"/doc-detail[{size}]"] = timed(lambda: get(f"/doc-detail/{document_id}"), args.repeat)
+    results[f"/doc-edit[{size}]"] = timed(edit, args.repeat)
+
+
+def compare(results, baseline_path, threshold):
+    """Print per-benchmark ratios against a baseline report; return the regressed names."""
+    with open(baseline_path, encoding='utf-8') as baseline_file:
+        baseline = json.load(baseline_file)['results']
+
+    regressions = []
+    print(f"\n{'benchmark':40} {'baseline':>10} {'current':>10} {'ratio':>7}")
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous or 'median_s' not in previous or 'median_s' not in current:
+            continue
+        ratio = current['median_s'] / previous['median_s'] if previous['median_s'] else float('inf')
+        flag = ''
+        if ratio > 1 + threshold:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print(f"{name:40} {previous['median_s'] * 1000:9.2f}ms {current['median_s'] * 1000:9.2f}ms "
+              f"{ratio:6.2f}x{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='10,100,500', help="Comma-separated corpus sizes (documents)")
+    parser.add_argument('--pages', type=int, default=10, help="Pages per document/fixture")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--skip-ingestion', action='store_true')
+    parser.add_argument('--output', default='bench_output.json')
+    parser.add_argument('--compare', metavar='BASELINE')
+    parser.add_argument('--threshold', type=float, default=0.2)
+    args = parser.parse_args()
+
+    from app import app
+    from models import db
+
+    # Measure the endpoints themselves, not admission control
+    app.config['RATE_LIMITS'] = {}
+
+    results = {}
+    with app.app_context():
+        db.create_all()
+    if not args.skip_ingestion:
+        ingestion_benchmarks(app, args, results)
+    for size in (int(size) for size in args.sizes.split(',')):
+        corpus_benchmarks(app, size, args, results)
+
+    report = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "pages_per_document": args.pages,
+        },
+        "results": results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as output:
+        json.dump(report, output, indent=2, ensure_ascii=False)
+
+    for name, result in results.items():
+        if 'skipped' in result:
+            print(f"{name:40} skipped ({result['skipped']})")
+        else:
+            print(f"{name:40} median {result['median_s'] * 1000:9.2f}ms  min {result['min_s'] * 1000:9.2f}ms")
+    print(f"Report written to {args.output}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    try:
+        status = main()
+    finally:
+        shutil.rmtree(WORKDIR, ignore_errors=True)
+    sys.exit(status)
@@ -1,6 +1,33 @@
+import click
+from flask.cli import with_appcontext
 from models import db
+from database.transfer import backfill_command, export_command, import_command
+from storage_gc import collect_garbage
 
 def init_db(app):
     db.init_app(app)
-    with app.app_context():
-        db.create_all()  # Create database tables
+    # Schema creation is an explicit step (`flask --app app init-db`), not an import side effect
+    app.cli.add_command(init_db_command)
+    app.cli.add_command(export_command)
+    app.cli.add_command(import_command)
+    app.cli.add_command(backfill_command)
+    app.cli.add_command(storage_gc_command)
+
+@click.command('init-db')
+@with_appcontext
+def init_db_command():
+    """Create database tables."""
+    db.create_all()
+    click.echo('Database tables created.')
+
+@click.command('storage-gc')
+@click.option('--dry-run', is_flag=True, help="Report what would be removed without deleting.")
+@click.option('--min-age', default=3600, show_default=True, help="Skip files modified within this many seconds.")
+@with_appcontext
+def storage_gc_command(dry_run, min_age):
+    """Remove files under storage/ that no document or thumbnail references."""
+    report = collect_garbage(min_age=min_age, dry_run=dry_run)
+    click.echo(
+        f"{'Would remove' if dry_run else 'Removed'} {report['files_removed']} files and "
+        f"{report['directories_removed']} directories, {report['bytes_reclaimed'] / 1e6:.1f} MB reclaimed."
+    )
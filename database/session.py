@@ -0,0 +1,16 @@
+from contextlib import contextmanager
+from sqlalchemy.orm import Session
+from models import db
+
+@contextmanager
+def ingest_session():
+    """Session on the dedicated ingestion pool; commits on success, rolls back on error."""
+    session = Session(bind=db.engines['ingest'])
+    try:
+        yield session
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
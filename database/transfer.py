@@ -0,0 +1,345 @@
+"""Bulk export/import of the corpus as a single streaming archive.
+
+The archive is a zip file holding `records.ndjson` (one document per line,
+with its pages, annotations and thumbnail references) and every referenced
+file under `files/<sha256>`, stored once however many records point at it.
+Both directions work a batch of documents at a time, so memory stays bounded
+regardless of corpus size.
+"""
+import io
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import insert
+from sqlalchemy.orm import selectinload
+
+from models import db, Annotation, Document, Page, Thumbnail, User
+from utils import STORAGE_PATH, file_sha256
+
+RECORDS = 'records.ndjson'
+FORMAT_VERSION = 1
+
+
+def _file_ref(archive, path, written):
+    """Add a file to the archive once (by content hash) and return its reference."""
+    if not path or not os.path.isfile(path):
+        return None
+    sha256 = file_sha256(path)
+    if sha256 not in written:
+        # Images and PDFs are already compressed
+        archive.write(path, f"files/{sha256}", compress_type=zipfile.ZIP_STORED)
+        written.add(sha256)
+    return {"sha256": sha256, "name": os.path.basename(path)}
+
+
+def export_corpus(archive_path, batch_size=100):
+    """Write every document to `archive_path`; returns counts of what was exported."""
+    stats = {"documents": 0, "pages": 0, "files": 0, "documents_missing_file": 0}
+    written = set()
+    with zipfile.ZipFile(archive_path, 'w', zipfile.ZIP_DEFLATED, allowZip64=True) as archive, \
+            tempfile.TemporaryFile() as records:
+        # Records are spooled to disk: zip members can only be written one at a time
+        lines = io.TextIOWrapper(records, encoding='utf-8')
+        last_id = 0
+        while True:
+            documents = (
+                Document.query
+                .options(
+                    selectinload(Document.pages).selectinload(Page.annotations),
+                    selectinload(Document.thumbnails),
+                    selectinload(Document.user)
+                )
+                .filter(Document.id > last_id)
+                .order_by(Document.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not documents:
+                break
+            for document in documents:
+                record = {
+                    "version": FORMAT_VERSION,
+                    "title": document.title,
+                    "type": document.type,
+                    "user_email": document.user.email if document.user else None,
+                    "file": _file_ref(archive, document.file_path, written),
+                    "file_name": os.path.basename(document.file_path),
+                    "pages": [{
+                        "page_number": page.page_number,
+                        "text": page.text,
+                        "jp_translation": page.jp_translation,
+                        "source_hash": page.source_hash,
+                        "edited": page.edited,
+                        "extraction_method": page.extraction_method,
+                        "annotations": [{
+                            "target_text": annotation.target_text,
+                            "type": annotation.type,
+                            "content": annotation.content
+                        } for annotation in page.annotations]
+                    } for page in sorted(document.pages, key=lambda page: (page.page_number or 0, page.id))],
+                    "thumbnails": [{
+                        "page_number": thumbnail.page_number,
+                        "source_hash": thumbnail.source_hash,
+                        "file": _file_ref(archive, thumbnail.image_path, written)
+                    } for thumbnail in document.thumbnails]
+                }
+                lines.write(json.dumps(record, ensure_ascii=False) + "\n")
+                stats["documents"] += 1
+                if record["file"] is None:
+                    stats["documents_missing_file"] += 1
+                stats["pages"] += len(record["pages"])
+            last_id = documents[-1].id
+            # Drop the batch from the identity map
+            db.session.expunge_all()
+
+        lines.flush()
+        records.seek(0)
+        with archive.open(RECORDS, 'w', force_zip64=True) as member:
+            shutil.copyfileobj(records, member)
+    stats["files"] = len(written)
+    return stats
+
+
+def _archive_name(name, fallback):
+    """A file name from the archive, reduced to its last component."""
+    name = os.path.basename(str(name or "").replace("\\", "/"))
+    return name if name not in ("", ".", "..") else fallback
+
+
+def _storage_target(*parts):
+    """Join `parts` below STORAGE_PATH, refusing paths that resolve outside it."""
+    root = os.path.realpath(STORAGE_PATH)
+    path = os.path.realpath(os.path.join(root, *parts))
+    if os.path.commonpath([root, path]) != root:
+        raise click.ClickException(f"Refusing to write outside storage/: {path}")
+    return path
+
+
+def _restore_file(archive, ref, target_path, stats):
+    """Extract a referenced file to `target_path`, reusing an identical existing file.
+
+    Returns the path the file ends up at, which differs from `target_path`
+    when another file with different content already occupies that name.
+    """
+    target_path = _storage_target(target_path)
+    if os.path.exists(target_path):
+        if file_sha256(target_path) == ref["sha256"]:
+            stats["files_skipped"] += 1
+            return target_path
+        stem, extension = os.path.splitext(target_path)
+        target_path = f"{stem}-{ref['sha256'][:8]}{extension}"
+        if os.path.exists(target_path):
+            stats["files_skipped"] += 1
+            return target_path
+
+    os.makedirs(os.path.dirname(target_path), exist_ok=True)
+    with archive.open(f"files/{ref['sha256']}") as source, open(target_path, 'wb') as target:
+        shutil.copyfileobj(source, target)
+    stats["files_written"] += 1
+    return target_path
+
+
+def backfill_file_hashes(batch_size=100):
+    """Hash the original file of documents stored before file_hash was recorded.
+
+    Returns the number of documents hashed; rows whose file is missing stay NULL.
+    """
+    hashed = 0
+    last_id = 0
+    while True:
+        documents = (
+            Document.query
+            .filter(Document.file_hash.is_(None), Document.id > last_id)
+            .order_by(Document.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not documents:
+            break
+        for document in documents:
+            if os.path.isfile(document.file_path):
+                document.file_hash = file_sha256(document.file_path)
+                hashed += 1
+        last_id = documents[-1].id
+        db.session.commit()
+        db.session.expunge_all()
+    return hashed
+
+
+def _missing_file_paths(target_path):
+    """Where a document without its file is recorded: `target_path`, or a
+    renamed path when another file or document already occupies it."""
+    stem, extension = os.path.splitext(target_path)
+    return target_path, f"{stem}-missing{extension}"
+
+
+def import_corpus(archive_path, owner_email=None, batch_size=100):
+    """Load an archive made by export_corpus; returns counts of what was imported.
+
+    Existing documents are hashed first (see backfill_file_hashes), then
+    documents whose original file hash already exists in the database are
+    skipped, so re-running an import is safe. Documents exported without
+    their original file (missing on disk at export time) are imported with
+    their pages, annotations and thumbnails, pointing at where the file would
+    be; they are skipped if a document without a hash already has that path.
+    Documents are attributed to the user with the exported email, falling
+    back to `owner_email`.
+    """
+    stats = {
+        "documents": 0, "documents_skipped": 0, "documents_missing_file": 0, "pages": 0,
+        "files_written": 0, "files_skipped": 0, "documents_hashed": backfill_file_hashes(batch_size)
+    }
+    user_ids = {}
+
+    def user_id_for(email):
+        if email not in user_ids:
+            user = User.query.filter_by(email=email).first() if email else None
+            user_ids[email] = user.id if user else None
+        return user_ids[email]
+
+    with zipfile.ZipFile(archive_path) as archive, archive.open(RECORDS) as records:
+        for line_number, line in enumerate(io.TextIOWrapper(records, encoding='utf-8'), start=1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            file_ref = record.get("file")
+            if file_ref:
+                target_path = _storage_target(
+                    'documents', _archive_name(file_ref.get("name"), file_ref["sha256"])
+                )
+                existing = Document.query.filter_by(file_hash=file_ref["sha256"])
+            else:
+                target_path = _storage_target(
+                    'documents', _archive_name(record.get("file_name"), f"missing-{line_number}")
+                )
+                existing = Document.query.filter(
+                    Document.file_hash.is_(None), Document.file_path.in_(_missing_file_paths(target_path))
+                )
+            if existing.first():
+                stats["documents_skipped"] += 1
+                continue
+
+            user_id = user_id_for(record.get("user_email")) or user_id_for(owner_email)
+            if user_id is None:
+                raise click.ClickException(
+                    f"Line {line_number}: no user {record.get('user_email')!r}; pass --owner"
+                )
+
+            if file_ref:
+                file_path = _restore_file(archive, file_ref, target_path, stats)
+            else:
+                # Record where the file belongs, without claiming another document's file
+                file_path, renamed_path = _missing_file_paths(target_path)
+                if os.path.exists(file_path) or Document.query.filter_by(file_path=file_path).first():
+                    file_path = renamed_path
+                stats["documents_missing_file"] += 1
+            document = Document(
+                title=record["title"],
+                type=record.get("type"),
+                file_path=file_path,
+                file_hash=file_ref["sha256"] if file_ref else None,
+                user_id=user_id
+            )
+            db.session.add(document)
+            db.session.flush()
+
+            if record["pages"]:
+                db.session.execute(insert(Page), [{
+                    "document_id": document.id,
+                    "page_number": page.get("page_number"),
+                    "text": page.get("text"),
+                    "jp_translation": page.get("jp_translation"),
+                    "source_hash": page.get("source_hash"),
+                    "edited": bool(page.get("edited")),
+                    "extraction_method": page.get("extraction_method")
+                } for page in record["pages"]])
+                # A new document's pages come back in insertion order
+                page_ids = db.session.scalars(
+                    db.select(Page.id).filter_by(document_id=document.id).order_by(Page.id)
+                ).all()
+                annotations = [
+                    {**annotation, "page_id": page_id}
+                    for page_id, page in zip(page_ids, record["pages"])
+                    for annotation in page.get("annotations", [])
+                ]
+                if annotations:
+                    db.session.execute(insert(Annotation), annotations)
+
+            thumbnail_dir = _storage_target(
+                'thumbnails', os.path.splitext(os.path.basename(file_path))[0]
+            )
+            thumbnails = []
+            for thumbnail in record.get("thumbnails", []):
+                if not thumbnail.get("file"):
+                    continue
+                try:
+                    page_number = int(thumbnail["page_number"])
+                except (TypeError, ValueError):
+                    raise click.ClickException(
+                        f"Line {line_number}: invalid thumbnail page number {thumbnail['page_number']!r}"
+                    )
+                image_path = _restore_file(
+                    archive, thumbnail["file"], os.path.join(thumbnail_dir, f"{page_number}.jpg"), stats
+                )
+                thumbnails.append({
+                    "document_id": document.id,
+                    "page_number": page_number,
+                    "image_path": image_path,
+                    "source_hash": thumbnail.get("source_hash")
+                })
+            if thumbnails:
+                db.session.execute(insert(Thumbnail), thumbnails)
+
+            stats["documents"] += 1
+            stats["pages"] += len(record["pages"])
+            if stats["documents"] % batch_size == 0:
+                db.session.commit()
+                db.session.expunge_all()
+    db.session.commit()
+    return stats
+
+
+@click.command('export-corpus')
+@click.argument('archive', type=click.Path(dir_okay=False))
+@click.option('--batch-size', default=100, show_default=True)
+@with_appcontext
+def export_command(archive, batch_size):
+    """Export all documents, pages, annotations and files to ARCHIVE."""
+    stats = export_corpus(archive, batch_size)
+    click.echo(f"Exported {stats['documents']} documents, {stats['pages']} pages, {stats['files']} files.")
+    if stats['documents_missing_file']:
+        click.echo(
+            f"Warning: {stats['documents_missing_file']} documents had no original file on disk; "
+            "they are exported with their pages and annotations only."
+        )
+
+
+@click.command('import-corpus')
+@click.argument('archive', type=click.Path(exists=True, dir_okay=False))
+@click.option('--owner', help="Email of the user who owns documents whose exporter is unknown here.")
+@click.option('--batch-size', default=100, show_default=True)
+@with_appcontext
+def import_command(archive, owner, batch_size):
+    """Import documents from an ARCHIVE written by export-corpus."""
+    stats = import_corpus(archive, owner, batch_size)
+    if stats['documents_hashed']:
+        click.echo(f"Hashed {stats['documents_hashed']} existing documents for duplicate detection.")
+    click.echo(
+        f"Imported {stats['documents']} documents ({stats['documents_skipped']} already present, "
+        f"{stats['documents_missing_file']} without an original file), "
+        f"{stats['pages']} pages; wrote {stats['files_written']} files, "
+        f"reused {stats['files_skipped']}."
+    )
+
+
+@click.command('backfill-file-hashes')
+@click.option('--batch-size', default=100, show_default=True)
+@with_appcontext
+def backfill_command(batch_size):
+    """Record the content hash of documents stored before hashes were kept."""
+    click.echo(f"Hashed {backfill_file_hashes(batch_size)} documents.")
@@ -0,0 +1,44 @@
+import multiprocessing
+import os
+
+# IIS proxies to localhost:5000 (see web.config); only it should reach the app
+bind = os.environ.get('BIND') or '127.0.0.1:5000'
+
+# Multi-process, threaded workers. Each worker owns its own SQLAlchemy pools,
+# so DB_POOL_SIZE defaults to GUNICORN_THREADS (see config.py). With the default
+# pools a worker can open 16 connections (8+4 request, 2+2 ingest), so workers
+# are capped at 4 by default: 64 connections, well under MySQL's default
+# max_connections of 151. OCR runs in Tesseract subprocesses, not in workers.
+worker_class = 'gthread'
+workers = int(os.environ.get('WEB_CONCURRENCY') or min(multiprocessing.cpu_count(), 4))
+threads = int(os.environ.get('GUNICORN_THREADS') or 8)
+
+# Connection budget on the MySQL server (its max_connections, less any other clients)
+db_max_connections = int(os.environ.get('DB_MAX_CONNECTIONS') or 151)
+
+# Uploads run thumbnailing/OCR inline, so allow long requests
+timeout = int(os.environ.get('GUNICORN_TIMEOUT') or 300)
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers periodically to bound memory growth from PIL/PyMuPDF
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS') or 1000)
+max_requests_jitter = 100
+
+# Don't preload: engines and their pools must be created after fork
+preload_app = False
+
+accesslog = '-'
+errorlog = '-'
+
+
+def on_starting(server):
+    from config import Config
+    pools = [Config.SQLALCHEMY_ENGINE_OPTIONS, *Config.SQLALCHEMY_BINDS.values()]
+    per_worker = sum(pool['pool_size'] + pool['max_overflow'] for pool in pools)
+    if workers * per_worker > db_max_connections:
+        server.log.warning(
+            "%d workers x %d pooled connections exceeds DB_MAX_CONNECTIONS=%d; "
+            "lower WEB_CONCURRENCY or the DB_*POOL_SIZE settings",
+            workers, per_worker, db_max_connections
+        )
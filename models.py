@@ -10,44 +10,63 @@ class Annotation(db.Model):
     target_text = db.Column(db.Text, nullable=True)
     type = db.Column(db.String(50), nullable=True) 
     content = db.Column(db.Text, nullable=True)
-    page_id = db.Column(db.Integer, db.ForeignKey('page.id'), nullable=False)
+    page_id = db.Column(db.Integer, db.ForeignKey('page.id', ondelete='CASCADE'), nullable=False)
 
 class Page(db.Model):
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     text = db.Column(db.Text, nullable=True)
     jp_translation = db.Column(db.Text, nullable=True)
-    document_id = db.Column(db.Integer, db.ForeignKey('document.id'), nullable=False)
+    document_id = db.Column(db.Integer, db.ForeignKey('document.id', ondelete='CASCADE'), nullable=False)
+    page_number = db.Column(db.Integer, nullable=True)  # 1-based page in the source file
+    source_hash = db.Column(db.String(64), nullable=True)  # Fingerprint of source page + extraction settings
+    edited = db.Column(db.Boolean, default=False, nullable=False)  # Set when text is edited by hand
+    extraction_method = db.Column(db.String(10), nullable=True)  # 'native' or 'ocr', from the last extraction
     
     # Relationship to annotations
-    annotations = db.relationship('Annotation', backref='page', lazy=True, cascade="all, delete-orphan")
+    annotations = db.relationship('Annotation', backref='page', lazy=True, cascade="all, delete-orphan", passive_deletes=True)
 
 class Document(db.Model):
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     title = db.Column(db.String(100), nullable=False)
     type = db.Column(db.String(20), nullable=True)
     file_path = db.Column(db.String(200), nullable=False)
+    file_hash = db.Column(db.String(64), nullable=True, index=True)  # SHA-256 of the original file
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
 
     # Add relationship to User
     user = db.relationship('User', backref='documents', lazy=True)
 
     # Relationship to Pages
-    pages = db.relationship('Page', backref='document', lazy=True, cascade="all, delete-orphan")
+    pages = db.relationship('Page', backref='document', lazy=True, cascade="all, delete-orphan", passive_deletes=True)
 
     # Relationship to Thumbnails
-    thumbnails = db.relationship('Thumbnail', backref='document', lazy=True, cascade="all, delete-orphan")
+    thumbnails = db.relationship('Thumbnail', backref='document', lazy=True, cascade="all, delete-orphan", passive_deletes=True)
+
+    # Relationship to ingestion profiles
+    profiles = db.relationship('ProcessingProfile', backref='document', lazy=True, cascade="all, delete-orphan", passive_deletes=True)
 
 
 class Thumbnail(db.Model):
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)  # Unique ID for each thumbnail
-    document_id = db.Column(db.Integer, db.ForeignKey('document.id'), nullable=False)
+    document_id = db.Column(db.Integer, db.ForeignKey('document.id', ondelete='CASCADE'), nullable=False)
     page_number = db.Column(db.Integer, nullable=False)  # Page number associated with the thumbnail
     image_path = db.Column(db.String(200), nullable=False)  # Path to the thumbnail image
+    source_hash = db.Column(db.String(64), nullable=True)  # Fingerprint of source page + thumbnail settings
 
     # Ensure a document can't have duplicate thumbnails for the same page
     __table_args__ = (db.UniqueConstraint('document_id', 'page_number', name='unique_thumbnail_per_page'),)
 
 
+class ProcessingProfile(db.Model):
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    document_id = db.Column(db.Integer, db.ForeignKey('document.id', ondelete='CASCADE'), nullable=False)
+    kind = db.Column(db.String(20), nullable=False)  # 'upload' or 'reprocess'
+    wall_ms = db.Column(db.Float, nullable=True)  # Total wall time of the ingestion run
+    stages = db.Column(db.JSON, nullable=True)  # Per-stage/per-page wall, CPU and peak RSS
+    sample_path = db.Column(db.String(200), nullable=True)  # Folded-stack sampling profile, if taken
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
 class News(db.Model):
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     title = db.Column(db.String(200), nullable=False)
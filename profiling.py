@@ -0,0 +1,166 @@
+"""Per-stage timings for the ingestion pipeline.
+
+Ingestion code marks its stages with `stage(name, page)`. Outside an active
+`profile_ingestion()` block that is a no-op. Inside one, each stage records
+wall time, CPU time of the request thread, CPU time of waited-for child
+processes (poppler, Tesseract), and the process's resident memory before and
+after the stage. RSS is process-wide, so concurrent requests show up in each
+other's deltas; `process_peak_rss_kb` is the process's lifetime high-water mark.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+try:
+    import resource  # Not available on Windows
+except ImportError:
+    resource = None
+
+try:
+    import psutil  # Optional; /proc is used on Linux without it
+except ImportError:
+    psutil = None
+
+_current = ContextVar('ingest_profiler', default=None)
+
+
+def _usage():
+    """(child CPU seconds, peak RSS in KiB) where the platform reports them."""
+    if resource is None:
+        return None, None
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        peak_rss //= 1024  # Reported in bytes on macOS
+    return children.ru_utime + children.ru_stime, peak_rss
+
+
+def _current_rss_kb():
+    """Current resident set size in KiB, or None where it can't be read."""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss // 1024
+    try:
+        with open('/proc/self/statm') as statm:
+            resident_pages = int(statm.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return resident_pages * os.sysconf('SC_PAGE_SIZE') // 1024
+
+
+class StackSampler:
+    """Samples one thread's Python stack into flamegraph "folded" format."""
+
+    def __init__(self, thread_id, interval=0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='ingest-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def write(self, path):
+        """Write `stack count` lines (flamegraph.pl, speedscope and inferno read these)."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as output:
+            for stack, count in self.stacks.most_common():
+                output.write(f"{stack} {count}\n")
+
+
+class IngestProfiler:
+    def __init__(self, sampler=None):
+        self.stages = []
+        self.sampler = sampler
+        self._started = time.perf_counter()
+        self.wall_ms = None
+
+    @contextmanager
+    def stage(self, name, page=None):
+        wall, cpu = time.perf_counter(), time.thread_time()
+        child_cpu, _ = _usage()
+        rss = _current_rss_kb()
+        try:
+            yield
+        finally:
+            child_cpu_after, peak_rss = _usage()
+            rss_after = _current_rss_kb()
+            self.stages.append({
+                "stage": name,
+                "page": page,
+                "wall_ms": round((time.perf_counter() - wall) * 1000, 3),
+                "cpu_ms": round((time.thread_time() - cpu) * 1000, 3),
+                "child_cpu_ms": round((child_cpu_after - child_cpu) * 1000, 3) if child_cpu is not None else None,
+                "rss_before_kb": rss,
+                "rss_after_kb": rss_after,
+                "rss_delta_kb": rss_after - rss if rss is not None else None,
+                "process_peak_rss_kb": peak_rss
+            })
+
+
+def summarize_stages(stages):
+    """Totals per stage name, across pages."""
+    totals = {}
+    for entry in stages:
+        total = totals.setdefault(entry["stage"], {
+            "count": 0, "wall_ms": 0.0, "cpu_ms": 0.0, "child_cpu_ms": 0.0, "max_rss_delta_kb": None
+        })
+        total["count"] += 1
+        total["wall_ms"] += entry["wall_ms"]
+        total["cpu_ms"] += entry["cpu_ms"]
+        total["child_cpu_ms"] += entry["child_cpu_ms"] or 0.0
+        delta = entry["rss_delta_kb"]
+        if delta is not None and (total["max_rss_delta_kb"] is None or delta > total["max_rss_delta_kb"]):
+            total["max_rss_delta_kb"] = delta
+    return totals
+
+
+@contextmanager
+def stage(name, page=None):
+    """Time a stage of the active ingestion profile, if any."""
+    profiler = _current.get()
+    if profiler is None:
+        yield
+        return
+    with profiler.stage(name, page):
+        yield
+
+
+@contextmanager
+def profile_ingestion(sample=False):
+    """Collect stage timings for the ingestion work done inside the block.
+
+    With `sample`, the calling thread's stack is also sampled for a
+    flamegraph; write it with `profiler.sampler.write(path)`.
+    """
+    sampler = StackSampler(threading.get_ident()) if sample else None
+    profiler = IngestProfiler(sampler)
+    token = _current.set(profiler)
+    if sampler:
+        sampler.start()
+    try:
+        yield profiler
+    finally:
+        if sampler:
+            sampler.stop()
+        profiler.wall_ms = round((time.perf_counter() - profiler._started) * 1000, 3)
+        _current.reset(token)
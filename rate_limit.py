@@ -0,0 +1,131 @@
+import math
+import threading
+import time
+from functools import wraps
+from flask import current_app, jsonify, request
+from models import User
+
+
+class MemoryStore:
+    """In-process token buckets.
+
+    Any object with the same `take` method (e.g. one backed by Redis) can be
+    assigned to `limiter.store` to share limits across worker processes.
+    """
+
+    # Past this many keys, buckets that have refilled completely are dropped
+    MAX_KEYS = 10000
+
+    def __init__(self):
+        self._buckets = {}  # key -> (tokens, updated_at, rate, burst)
+        self._lock = threading.Lock()
+
+    def take(self, buckets, cost=1):
+        """Consume `cost` from every (key, rate, burst) bucket, or from none.
+
+        Returns (0, None) when admitted, otherwise (seconds until the request
+        would be admitted, key of the bucket that refused it).
+        """
+        now = time.monotonic()
+        with self._lock:
+            levels = []
+            retry_after, limited_by = 0, None
+            for key, rate, burst in buckets:
+                tokens, updated_at, _, _ = self._buckets.get(key, (burst, now, rate, burst))
+                tokens = min(burst, tokens + (now - updated_at) * rate)
+                levels.append((key, tokens, rate, burst))
+                wait = (cost - tokens) / rate if tokens < cost else 0
+                if wait > retry_after:
+                    retry_after, limited_by = wait, key
+            if limited_by:
+                return retry_after, limited_by
+            for key, tokens, rate, burst in levels:
+                self._buckets[key] = (tokens - cost, now, rate, burst)
+            if len(self._buckets) > self.MAX_KEYS:
+                self._prune(now)
+            return 0, None
+
+    def _prune(self, now):
+        # A full bucket is indistinguishable from a missing one
+        for key, (tokens, updated_at, rate, burst) in list(self._buckets.items()):
+            if tokens + (now - updated_at) * rate >= burst:
+                del self._buckets[key]
+
+
+class RateLimiter:
+    """Token-bucket rate limits plus a concurrency cap per endpoint group."""
+
+    def __init__(self, store=None):
+        self.store = store or MemoryStore()
+        self._semaphores = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def _count(self, name, counter, delta=1):
+        with self._lock:
+            counters = self._counters.setdefault(name, {
+                "admitted": 0, "limited_user": 0, "limited_global": 0, "rejected_busy": 0, "in_flight": 0
+            })
+            counters[counter] += delta
+
+    def _semaphore(self, name, max_concurrent):
+        with self._lock:
+            if name not in self._semaphores:
+                self._semaphores[name] = threading.BoundedSemaphore(max_concurrent)
+            return self._semaphores[name]
+
+    def metrics(self):
+        with self._lock:
+            return {name: dict(counters) for name, counters in self._counters.items()}
+
+    def limit(self, name):
+        """Decorator applying the `RATE_LIMITS[name]` settings from the app config.
+
+        Must sit below `token_required` so the per-user bucket is keyed on
+        the authenticated user; anonymous requests are keyed on client IP
+        (as resolved by ProxyFix, see TRUSTED_PROXY_HOPS).
+        """
+        def decorator(f):
+            @wraps(f)
+            def decorated(*args, **kwargs):
+                settings = current_app.config.get('RATE_LIMITS', {}).get(name)
+                if not settings:
+                    return f(*args, **kwargs)
+
+                if args and isinstance(args[0], User):
+                    client = f"user:{args[0].id}"
+                else:
+                    client = f"ip:{request.remote_addr}"
+                user_bucket = (f"{name}:{client}", settings['user_rate'], settings['user_burst'])
+                global_bucket = (f"{name}:*", settings['global_rate'], settings['global_burst'])
+
+                # Both buckets are charged atomically, so a refused request costs nothing
+                retry_after, limited_by = self.store.take([user_bucket, global_bucket])
+                if limited_by:
+                    self._count(name, "limited_global" if limited_by == global_bucket[0] else "limited_user")
+                    return _reject(429, 'Too many requests, try again later', retry_after)
+
+                semaphore = self._semaphore(name, settings['max_concurrent'])
+                if not semaphore.acquire(timeout=settings.get('queue_timeout', 0)):
+                    self._count(name, "rejected_busy")
+                    return _reject(503, 'Server busy, try again later', settings.get('busy_retry_after', 5))
+
+                self._count(name, "admitted")
+                self._count(name, "in_flight")
+                try:
+                    return f(*args, **kwargs)
+                finally:
+                    self._count(name, "in_flight", -1)
+                    semaphore.release()
+            return decorated
+        return decorator
+
+
+def _reject(status, message, retry_after):
+    response = jsonify({'message': message})
+    response.status_code = status
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+limiter = RateLimiter()
@@ -1,8 +1,12 @@
 import os
 from flask import Blueprint, request, jsonify, send_file, current_app
-from models import db, Document, User, News, Page, Annotation
+from models import db, Document, User, News, Page, Annotation, Thumbnail, ProcessingProfile
 # from ocr import perform_ocr  # Import OCR functionality
-from utils import *
+from utils import file_sha256, process_thumbnails, reprocess_document, save_profile, search_by_keyword
+from database.session import ingest_session
+from storage_gc import last_collection, schedule_collection, schedule_file_removal
+from rate_limit import limiter
+from profiling import profile_ingestion, stage, summarize_stages
 from functools import wraps
 from datetime import datetime
 
@@ -30,6 +34,7 @@ def token_required(f):
 
 @main_routes.route('/upload', methods=['POST'])
 @token_required
+@limiter.limit('upload')
 def upload_file(current_user):
     file = request.files.get('file')
     file_type = request.form.get('type')
@@ -43,47 +48,67 @@ def upload_file(current_user):
     if not os.path.exists(documents_path):
         os.makedirs(documents_path)
     file_path = f"{documents_path}/{file.filename}"
-    file.save(file_path)
-    
+
+    user_id = current_user.id
+    # Admins can ask for a sampled stack profile of this upload (?profile=sample)
+    sample = current_user.role == 'admin' and request.args.get('profile') == 'sample'
+    # Return the request connection to the read pool; ingestion runs on its own pool
+    db.session.close()
+
+    with profile_ingestion(sample) as profiler:
+        with stage('upload.save'):
+            file.save(file_path)
+        with ingest_session() as session:
+            document_id = ingest_upload(session, file.filename, file_type, file_path, user_id)
+
+    with ingest_session() as session:
+        save_profile(session, document_id, 'upload', profiler)
+
+    return jsonify({
+        "status": True, 
+        "message": "File uploaded successfully", 
+        "document_id": document_id
+    })
+
+def ingest_upload(session, filename, file_type, file_path, user_id):
+    """Create the Document for a saved upload and process it; returns the document id."""
     # Create document
+    with stage('upload.hash'):
+        file_hash = file_sha256(file_path)
     document = Document(
-        title=file.filename,
+        title=filename,
         type=file_type,
         file_path=file_path,
-        user_id=current_user.id
+        file_hash=file_hash,
+        user_id=user_id
     )
-    db.session.add(document)
-    db.session.flush()  # Get document.id before commit
+    session.add(document)
+    session.flush()  # Get document.id before commit
+    document_id = document.id
 
     if file_type is not 'search':
         # Process thumbnails
-        process_thumbnails(file_path, document.id)
-        
-        db.session.commit()
-        return jsonify({
-            "status": True, 
-            "message": "File uploaded successfully", 
-            "document_id": document.id
-        })
-    
+        process_thumbnails(file_path, document_id, session)
+        return document_id
+
     # Determine number of pages based on file type
     num_pages = 1  # Default for image files
-    if file.filename.lower().endswith('.pdf'):
+    if filename.lower().endswith('.pdf'):
         import PyPDF2
         with open(file_path, 'rb') as pdf_file:
             pdf_reader = PyPDF2.PdfReader(pdf_file)
             num_pages = len(pdf_reader.pages)
-    
+
     # Create pages with sample data
     for page_num in range(1, num_pages + 1):
         page = Page(
             text=f"ページ{page_num}の本文です。内容を追加してください。",
             jp_translation=f"ページ{page_num}の日本語訳です。内容を追加してください。",
-            document_id=document.id
+            document_id=document_id
         )
-        db.session.add(page)
-        db.session.flush()  # Get page.id before creating annotation
-        
+        session.add(page)
+        session.flush()  # Get page.id before creating annotation
+
         # Create default annotation for the page
         annotation = Annotation(
             target_text="注釈",
@@ -91,18 +116,11 @@ def upload_file(current_user):
             content="注釈の内容",
             page_id=page.id
         )
-        db.session.add(annotation)
-    
+        session.add(annotation)
+
     # Process thumbnails
-    process_thumbnails(file_path, document.id)
-    
-    db.session.commit()
-    
-    return jsonify({
-        "status": True, 
-        "message": "File uploaded successfully", 
-        "document_id": document.id
-    })
+    process_thumbnails(file_path, document_id, session)
+    return document_id
 
 @main_routes.route('/register', methods=['POST'])
 def register():
@@ -202,6 +220,7 @@ def get_document(doc_id):
             "id": page.id,
             "text": page.text,
             "jp_translation": page.jp_translation,
+            "extraction_method": page.extraction_method,
             "annotations": annotations
         })
     
@@ -236,10 +255,13 @@ def edit_document(current_user, doc_id):
             page = Page.query.get(page_data['id'])
             if page:
                 if page.document_id == document.id:
-                    if 'text' in page_data:
+                    # /doc-edit sends every page; only pages whose text changed count as hand-edited
+                    if 'text' in page_data and page.text != page_data['text']:
                         page.text = page_data['text']
-                    if 'jp_translation' in page_data:
+                        page.edited = True
+                    if 'jp_translation' in page_data and page.jp_translation != page_data['jp_translation']:
                         page.jp_translation = page_data['jp_translation']
+                        page.edited = True
                     
                     # Handle annotations
                     if 'annotations' in page_data:
@@ -272,7 +294,8 @@ def edit_document(current_user, doc_id):
                     id=page_data['id'],
                     text=page_data.get('text'),
                     jp_translation=page_data.get('jp_translation'),
-                    document_id=document.id
+                    document_id=document.id,
+                    edited=True
                 )
                 db.session.add(page)
                 
@@ -292,30 +315,81 @@ def edit_document(current_user, doc_id):
 @main_routes.route('/doc-delete/<int:doc_id>', methods=['DELETE'])
 @token_required
 def delete_document(current_user, doc_id):
-    document = Document.query.filter_by(id=doc_id, user_id=current_user.id).first()
-    if not document:
+    file_path = db.session.query(Document.file_path).filter_by(id=doc_id, user_id=current_user.id).scalar()
+    if not file_path:
         return jsonify({"error": "Document not found"}), 404
-    
-    # Delete physical file
-    if os.path.exists(document.file_path):
-        os.remove(document.file_path)
-    
-    # Delete thumbnails files
-    for thumbnail in document.thumbnails:
-        if os.path.exists(thumbnail.image_path):
-            os.remove(thumbnail.image_path)
-    
-    # Delete document (will cascade delete pages, annotations, and thumbnails)
-    db.session.delete(document)
+
+    thumbnail_paths = [path for (path,) in db.session.query(Thumbnail.image_path).filter_by(document_id=doc_id)]
+
+    # Bulk-delete children bottom-up without loading them, so this also works
+    # on schemas created before the foreign keys had ON DELETE CASCADE
+    page_ids = db.session.query(Page.id).filter_by(document_id=doc_id)
+    Annotation.query.filter(Annotation.page_id.in_(page_ids.scalar_subquery())).delete(synchronize_session=False)
+    Page.query.filter_by(document_id=doc_id).delete(synchronize_session=False)
+    Thumbnail.query.filter_by(document_id=doc_id).delete(synchronize_session=False)
+    ProcessingProfile.query.filter_by(document_id=doc_id).delete(synchronize_session=False)
+    Document.query.filter_by(id=doc_id).delete(synchronize_session=False)
     db.session.commit()
-    
+
+    # Original and thumbnail files are removed in the background
+    schedule_file_removal(current_app._get_current_object(), file_path, thumbnail_paths)
+
     return jsonify({"message": "Document deleted successfully"})
 
+@main_routes.route('/doc-reprocess/<int:doc_id>', methods=['POST'])
+@token_required
+def reprocess(current_user, doc_id):
+    """Redo text extraction and thumbnails only for pages whose source or settings changed.
+
+    Accepts an optional corrected `file` (same extension) and the flags
+    `override_edits` (replace hand-edited text) and `force` (ignore fingerprints).
+    """
+    if current_user.role != 'admin':
+        return jsonify({"error": "Unauthorized"}), 403
+
+    options = request.get_json(silent=True) or request.form
+    override_edits = str(options.get('override_edits', '')).lower() in ('1', 'true', 'yes')
+    force = str(options.get('force', '')).lower() in ('1', 'true', 'yes')
+    file = request.files.get('file')
+    sample = request.args.get('profile') == 'sample'
+
+    # Return the request connection to the read pool; ingestion runs on its own pool
+    db.session.close()
+
+    with profile_ingestion(sample) as profiler, ingest_session() as session:
+        document = session.get(Document, doc_id)
+        if not document:
+            return jsonify({"error": "Document not found"}), 404
+
+        if file:
+            # Corrected scan replaces the stored original in place
+            if os.path.splitext(file.filename)[1].lower() != os.path.splitext(document.file_path)[1].lower():
+                return jsonify({"error": "Replacement file must have the same type"}), 400
+            with stage('upload.save'):
+                file.save(document.file_path)
+            # Keep the import dedupe key in step with the replaced original
+            with stage('upload.hash'):
+                document.file_hash = file_sha256(document.file_path)
+
+        summary = reprocess_document(document, session, override_edits=override_edits, force=force)
+
+    with ingest_session() as session:
+        save_profile(session, doc_id, 'reprocess', profiler)
+
+    return jsonify({"status": True, "document_id": doc_id, **summary})
+
 @main_routes.route('/search', methods=['GET'])
+@limiter.limit('search')
 def search_documents():
     keyword = request.args.get('keyword')
+    if not keyword:
+        return jsonify({'message': 'Missing keyword'}), 400
+    context_chars = min(
+        request.args.get('context', current_app.config['SEARCH_CONTEXT_CHARS'], type=int),
+        current_app.config['SEARCH_MAX_CONTEXT_CHARS']
+    )
     # Logic to search documents by keyword
-    results = search_by_keyword(keyword)
+    results = search_by_keyword(keyword, max(0, context_chars))
     return jsonify(results)  # Return search results
 
 @main_routes.route('/news', methods=['GET'])
@@ -424,6 +498,71 @@ def get_all_users(current_user):
         'created_at': user.created_at.isoformat()
     } for user in users])
 
+# 管理者用ルート - ストレージGC
+@main_routes.route('/admin/storage-gc', methods=['POST'])
+@token_required
+def admin_storage_gc(current_user):
+    # 管理者権限チェック
+    if current_user.role != 'admin':
+        return jsonify({'message': 'Unauthorized access'}), 403
+
+    dry_run = str(request.args.get('dry_run', '')).lower() in ('1', 'true', 'yes')
+    # Walking storage/ can take minutes, so it runs on the background GC thread
+    if not schedule_collection(current_app._get_current_object(), dry_run=dry_run):
+        return jsonify({'message': 'Storage GC already in progress', **last_collection()}), 409
+    return jsonify({'message': 'Storage GC scheduled', **last_collection()}), 202
+
+@main_routes.route('/admin/storage-gc', methods=['GET'])
+@token_required
+def admin_storage_gc_status(current_user):
+    # 管理者権限チェック
+    if current_user.role != 'admin':
+        return jsonify({'message': 'Unauthorized access'}), 403
+
+    # Per worker process: the status comes from whichever worker serves this request
+    return jsonify(last_collection())
+
+# 管理者用ルート - メトリクス
+@main_routes.route('/admin/metrics', methods=['GET'])
+@token_required
+def admin_metrics(current_user):
+    # 管理者権限チェック
+    if current_user.role != 'admin':
+        return jsonify({'message': 'Unauthorized access'}), 403
+
+    return jsonify({'rate_limits': limiter.metrics()})
+
+# 管理者用ルート - 取り込みプロファイル
+@main_routes.route('/admin/doc-profile/<int:doc_id>', methods=['GET'])
+@token_required
+def admin_document_profiles(current_user, doc_id):
+    # 管理者権限チェック
+    if current_user.role != 'admin':
+        return jsonify({'message': 'Unauthorized access'}), 403
+
+    profiles = ProcessingProfile.query.filter_by(document_id=doc_id).order_by(ProcessingProfile.created_at.desc()).all()
+    return jsonify([{
+        'id': profile.id,
+        'kind': profile.kind,
+        'wall_ms': profile.wall_ms,
+        'created_at': profile.created_at.isoformat(),
+        'summary': summarize_stages(profile.stages or []),
+        'stages': profile.stages,
+        'sample_url': f"/admin/doc-profile/{doc_id}/{profile.id}/sample" if profile.sample_path else None
+    } for profile in profiles])
+
+@main_routes.route('/admin/doc-profile/<int:doc_id>/<int:profile_id>/sample', methods=['GET'])
+@token_required
+def admin_document_profile_sample(current_user, doc_id, profile_id):
+    # 管理者権限チェック
+    if current_user.role != 'admin':
+        return jsonify({'message': 'Unauthorized access'}), 403
+
+    profile = ProcessingProfile.query.filter_by(id=profile_id, document_id=doc_id).first()
+    if not profile or not profile.sample_path or not os.path.exists(profile.sample_path):
+        return jsonify({'message': 'Profile sample not found'}), 404
+    return send_file(profile.sample_path, mimetype='text/plain', as_attachment=True)
+
 # 管理者用ルート - ユーザー作成
 @main_routes.route('/admin/users', methods=['POST'])
 @token_required
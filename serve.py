@@ -0,0 +1,21 @@
+"""Cross-platform production server (Windows/IIS included): python serve.py
+
+waitress is a single-process, multi-threaded server. To use more cores,
+run one instance per port (PORT=5001, 5002, ...) and list them in an IIS
+ARR server farm; on Linux, gunicorn.conf.py runs multiple workers instead.
+"""
+import os
+from waitress import serve
+from wsgi import app
+
+if __name__ == '__main__':
+    serve(
+        app,
+        # IIS proxies to localhost:5000 (see web.config)
+        host=os.environ.get('HOST') or '127.0.0.1',
+        port=int(os.environ.get('PORT') or 5000),
+        # Each thread can hold one request-pool connection (DB_POOL_SIZE defaults to this)
+        threads=int(os.environ.get('WAITRESS_THREADS') or 8),
+        # Uploads run thumbnailing/OCR inline, so allow long requests
+        channel_timeout=int(os.environ.get('WAITRESS_CHANNEL_TIMEOUT') or 300),
+    )
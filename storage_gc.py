@@ -0,0 +1,190 @@
+import os
+import time
+import logging
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from models import db, Document, ProcessingProfile, Thumbnail
+from utils import STORAGE_PATH
+
+logger = logging.getLogger(__name__)
+
+# Files younger than this are left alone: an upload saves its file before
+# the Document row is committed
+GC_MIN_AGE_SECONDS = 3600
+
+# One background thread per worker process is plenty for file removal
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='storage-gc')
+
+# Most recent background collection in this worker process
+_last_collection = {"status": "idle"}
+_collection_lock = threading.Lock()
+
+
+def _new_report():
+    return {"files_removed": 0, "directories_removed": 0, "bytes_reclaimed": 0}
+
+
+def _remove_file(path, report, modified_before=None):
+    """Remove a file, unless it was written after `modified_before` (a timestamp)."""
+    try:
+        if modified_before is not None and os.path.getmtime(path) > modified_before:
+            return
+        size = os.path.getsize(path)
+        os.remove(path)
+    except FileNotFoundError:
+        return
+    report["files_removed"] += 1
+    report["bytes_reclaimed"] += size
+
+
+def _remove_empty_dirs(root, report, keep_root=True):
+    """Remove empty directories below (and optionally including) `root`."""
+    if not os.path.isdir(root):
+        return
+    for directory, subdirectories, files in os.walk(root, topdown=False):
+        if keep_root and directory == root:
+            continue
+        try:
+            os.rmdir(directory)  # Fails if not empty
+            report["directories_removed"] += 1
+        except OSError:
+            pass
+
+
+def _referenced_paths():
+    """Absolute paths of every file the database still points at."""
+    referenced = set()
+    for (path,) in db.session.query(Document.file_path).yield_per(1000):
+        referenced.add(os.path.abspath(path))
+    for (path,) in db.session.query(Thumbnail.image_path).yield_per(1000):
+        referenced.add(os.path.abspath(path))
+    for (path,) in db.session.query(ProcessingProfile.sample_path).filter(
+        ProcessingProfile.sample_path.isnot(None)
+    ).yield_per(1000):
+        referenced.add(os.path.abspath(path))
+    return referenced
+
+
+def collect_garbage(min_age=GC_MIN_AGE_SECONDS, dry_run=False):
+    """Remove files under storage/ that no Document, Thumbnail or profile references.
+
+    Also removes directories left empty (e.g. storage/thumbnails/<stem>).
+    Returns counts and bytes reclaimed; with `dry_run` nothing is deleted.
+    """
+    report = _new_report()
+    referenced = _referenced_paths()
+    cutoff = time.time() - min_age
+
+    roots = [os.path.join(STORAGE_PATH, folder) for folder in ('documents', 'thumbnails', 'profiles')]
+    for root in roots:
+        for directory, _, files in os.walk(root):
+            for name in files:
+                path = os.path.abspath(os.path.join(directory, name))
+                if path in referenced:
+                    continue
+                try:
+                    if os.path.getmtime(path) > cutoff:
+                        continue
+                except FileNotFoundError:
+                    continue
+                if dry_run:
+                    report["files_removed"] += 1
+                    report["bytes_reclaimed"] += os.path.getsize(path)
+                else:
+                    _remove_file(path, report)
+        if not dry_run:
+            _remove_empty_dirs(root, report)
+
+    logger.info(
+        "Storage GC%s: %d files, %d directories, %d bytes reclaimed",
+        " (dry run)" if dry_run else "",
+        report["files_removed"], report["directories_removed"], report["bytes_reclaimed"]
+    )
+    return report
+
+
+def _run_collection(app, min_age, dry_run):
+    """Background half of an admin GC request: run it and keep the outcome."""
+    with app.app_context():
+        _update_collection(status="running", started_at=datetime.utcnow().isoformat())
+        try:
+            report = collect_garbage(min_age, dry_run)
+        except Exception as error:
+            logger.exception("Storage GC failed")
+            _update_collection(status="failed", error=str(error), finished_at=datetime.utcnow().isoformat())
+        else:
+            _update_collection(status="done", report=report, finished_at=datetime.utcnow().isoformat())
+        finally:
+            db.session.remove()
+
+
+def _update_collection(**fields):
+    with _collection_lock:
+        _last_collection.update(fields)
+
+
+def schedule_collection(app, min_age=GC_MIN_AGE_SECONDS, dry_run=False):
+    """Queue collect_garbage on the background GC thread.
+
+    Returns False without queueing if a collection is already pending or running.
+    """
+    global _last_collection
+    with _collection_lock:
+        if _last_collection["status"] in ("queued", "running"):
+            return False
+        _last_collection = {
+            "status": "queued", "dry_run": dry_run, "queued_at": datetime.utcnow().isoformat()
+        }
+    _executor.submit(_run_collection, app, min_age, dry_run)
+    return True
+
+
+def last_collection():
+    """Status and report of this process's latest scheduled collection."""
+    with _collection_lock:
+        return dict(_last_collection)
+
+
+def _remove_document_files(app, file_path, thumbnail_paths, deleted_at):
+    """Background half of a document delete: drop its files unless still referenced.
+
+    Files written after `deleted_at` belong to a re-upload under the same
+    name (whose Document may not be committed yet) and are left alone.
+    """
+    with app.app_context():
+        report = _new_report()
+        if not Document.query.filter_by(file_path=file_path).first():
+            _remove_file(file_path, report, deleted_at)
+
+        still_referenced = {
+            path for (path,) in db.session.query(Thumbnail.image_path)
+            .filter(Thumbnail.image_path.in_(thumbnail_paths))
+        } if thumbnail_paths else set()
+        directories = set()
+        for path in thumbnail_paths:
+            directories.add(os.path.dirname(path))
+            if path not in still_referenced:
+                _remove_file(path, report, deleted_at)
+        for directory in directories:
+            _remove_empty_dirs(directory, report, keep_root=False)
+
+        db.session.remove()
+        logger.info(
+            "Removed files of deleted document %s: %d files, %d bytes",
+            os.path.basename(file_path), report["files_removed"], report["bytes_reclaimed"]
+        )
+
+
+def schedule_file_removal(app, file_path, thumbnail_paths):
+    """Remove a deleted document's files on the background GC thread."""
+    # Queued behind any running collection, so note when the delete happened
+    future = _executor.submit(_remove_document_files, app, file_path, list(thumbnail_paths), time.time())
+    future.add_done_callback(_log_failure)
+    return future
+
+
+def _log_failure(future):
+    error = future.exception()
+    if error is not None:
+        logger.error("Background file removal failed", exc_info=error)
@@ -0,0 +1,57 @@
+import os
+import tempfile
+import zipfile
+
+import pytest
+
+# Must be set before config.py is imported
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='ocr-test-'), 'test.db')}"
+
+W = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+MC = 'http://schemas.openxmlformats.org/markup-compatibility/2006'
+
+
+@pytest.fixture
+def docx(tmp_path):
+    """Write a DOCX with the given document.xml body; returns its path."""
+    def write(body, name='test.docx'):
+        path = tmp_path / name
+        with zipfile.ZipFile(path, 'w') as archive:
+            # No _rels/.rels: the reader falls back to word/document.xml
+            archive.writestr('word/document.xml', (
+                f'<w:document xmlns:w="{W}" xmlns:mc="{MC}"><w:body>{body}<w:sectPr/></w:body></w:document>'
+            ))
+        return str(path)
+    return write
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """The Flask app on an empty database, with storage/ under tmp_path."""
+    import storage_gc
+    import utils
+    from app import app
+    from database import transfer
+    from models import db
+
+    storage_path = str(tmp_path / 'storage')
+    monkeypatch.setattr(utils, 'STORAGE_PATH', storage_path)
+    monkeypatch.setattr(storage_gc, 'STORAGE_PATH', storage_path)
+    monkeypatch.setattr(transfer, 'STORAGE_PATH', storage_path)
+    # Limiter buckets live for the whole test session
+    monkeypatch.setitem(app.config, 'RATE_LIMITS', {})
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def user(app):
+    from models import db, User
+    user = User(username='admin', email='admin@example.com', role='admin', is_active=True)
+    user.set_password('password')
+    db.session.add(user)
+    db.session.commit()
+    return user
@@ -0,0 +1,98 @@
+"""Page splitting in utils.read_docx_pages, on hand-written document.xml bodies."""
+from utils import read_docx_pages
+
+WPS = 'http://schemas.microsoft.com/office/word/2010/wordprocessingShape'
+
+
+def p(*runs, props=''):
+    return f'<w:p>{f"<w:pPr>{props}</w:pPr>" if props else ""}{"".join(runs)}</w:p>'
+
+
+def r(text):
+    return f'<w:r><w:t>{text}</w:t></w:r>'
+
+
+def text_box(*paragraphs):
+    """A drawing holding a text box; it goes inside a run."""
+    return (
+        f'<w:drawing><wps:txbx xmlns:wps="{WPS}"><w:txbxContent>'
+        f'{"".join(paragraphs)}'
+        '</w:txbxContent></wps:txbx></w:drawing>'
+    )
+
+
+def test_explicit_page_break(docx):
+    path = docx(p(r('one')) + p('<w:r><w:br w:type="page"/></w:r>', r('two')))
+    assert read_docx_pages(path) == ['one', 'two']
+
+
+def test_page_break_mid_paragraph(docx):
+    path = docx(p(r('A'), '<w:r><w:br w:type="page"/></w:r>', r('B')))
+    assert read_docx_pages(path) == ['A', 'B']
+
+
+def test_line_and_column_breaks(docx):
+    path = docx(p(r('A'), '<w:r><w:br/></w:r>', r('B'), '<w:r><w:br w:type="column"/></w:r>', r('C')))
+    assert read_docx_pages(path) == ['A\nBC']
+
+
+def test_last_rendered_page_break(docx):
+    path = docx(p(r('one')) + p('<w:r><w:lastRenderedPageBreak/><w:t>two</w:t></w:r>'))
+    assert read_docx_pages(path) == ['one', 'two']
+
+
+def test_coinciding_breaks_make_no_empty_page(docx):
+    path = docx(
+        p(r('one'), '<w:r><w:br w:type="page"/></w:r>')
+        + p('<w:r><w:lastRenderedPageBreak/><w:t>two</w:t></w:r>')
+    )
+    assert read_docx_pages(path) == ['one', 'two']
+
+
+def test_page_break_before(docx):
+    path = docx(
+        p(r('one'))
+        + p(r('two'), props='<w:pageBreakBefore/>')
+        + p(r('still two'), props='<w:pageBreakBefore w:val="0"/>')
+    )
+    assert read_docx_pages(path) == ['one', 'two\nstill two']
+
+
+def test_section_breaks(docx):
+    path = docx(
+        p(r('one'), props='<w:sectPr/>')
+        + p(r('two'), props='<w:sectPr><w:type w:val="continuous"/></w:sectPr>')
+        + p(r('still two'))
+    )
+    assert read_docx_pages(path) == ['one', 'two\nstill two']
+
+
+def test_text_box_follows_host_paragraph(docx):
+    path = docx(p(r('A1'), f'<w:r>{text_box(p(r("TB")))}</w:r>', r('A2')) + p(r('B')))
+    assert read_docx_pages(path) == ['A1A2\nTB\nB']
+
+
+def test_breaks_inside_text_box_do_not_split_pages(docx):
+    box = text_box(
+        p('<w:r><w:lastRenderedPageBreak/><w:t>TB</w:t></w:r>', '<w:r><w:br w:type="page"/></w:r>'),
+        p(r('TB2'), props='<w:pageBreakBefore/>')
+    )
+    path = docx(p(r('A'), f'<w:r>{box}</w:r>'))
+    assert read_docx_pages(path) == ['A\nTB\nTB2']
+
+
+def test_run_content_after_nested_run(docx):
+    # The text box's </w:r> must not end the outer run
+    path = docx(p(f'<w:r>{text_box(p(r("TB")))}<w:tab/><w:t>A</w:t><w:br/><w:t>B</w:t></w:r>'))
+    assert read_docx_pages(path) == ['\tA\nB\nTB']
+
+
+def test_fallback_text_box_is_not_duplicated(docx):
+    path = docx(p(
+        r('A'),
+        '<mc:AlternateContent>'
+        f'<mc:Choice Requires="wps"><w:r>{text_box(p(r("TB")))}</w:r></mc:Choice>'
+        f'<mc:Fallback><w:r><w:pict><w:txbxContent>{p(r("TB"))}</w:txbxContent></w:pict></w:r></mc:Fallback>'
+        '</mc:AlternateContent>'
+    ))
+    assert read_docx_pages(path) == ['A\nTB']
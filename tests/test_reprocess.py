@@ -0,0 +1,52 @@
+"""utils.reprocess_document against pages already in the database."""
+from models import db, Document, Page
+from utils import reprocess_document
+
+BODY = '<w:p><w:r><w:t>one</w:t></w:r></w:p><w:p><w:r><w:br w:type="page"/><w:t>two</w:t></w:r></w:p>'
+
+
+def make_document(user, path, pages):
+    document = Document(title='test', type='1', file_path=path, user_id=user.id)
+    db.session.add(document)
+    db.session.flush()
+    db.session.add_all(Page(document_id=document.id, **page) for page in pages)
+    db.session.commit()
+    return document
+
+
+def page_texts(document):
+    return [page.text for page in Page.query.filter_by(document_id=document.id).order_by(Page.page_number)]
+
+
+def test_extracts_new_pages(user, docx):
+    document = make_document(user, docx(BODY), [])
+    summary = reprocess_document(document, db.session)
+    assert summary["text_reprocessed"] == [1, 2]
+    assert summary["extraction_methods"] == {1: 'native', 2: 'native'}
+    assert page_texts(document) == ['one', 'two']
+
+
+def test_keeps_legacy_hand_transcriptions(user, docx):
+    # Rows from before fingerprints existed: text came from /doc-edit, edited defaulted to False
+    document = make_document(user, docx(BODY), [
+        {"text": "HAND TRANSCRIPTION 1"},
+        {"jp_translation": "HAND TRANSLATION 2"},
+    ])
+    summary = reprocess_document(document, db.session)
+    assert summary["edits_preserved"] == [1, 2]
+    assert summary["text_reprocessed"] == []
+    assert page_texts(document) == ['HAND TRANSCRIPTION 1', None]
+    assert all(page.edited for page in document.pages)
+
+
+def test_override_edits_replaces_legacy_text(user, docx):
+    document = make_document(user, docx(BODY), [{"text": "HAND TRANSCRIPTION"}])
+    summary = reprocess_document(document, db.session, override_edits=True)
+    assert summary["text_reprocessed"] == [1, 2]
+    assert page_texts(document) == ['one', 'two']
+
+
+def test_empty_legacy_pages_are_extracted(user, docx):
+    document = make_document(user, docx(BODY), [{}, {}])
+    reprocess_document(document, db.session)
+    assert page_texts(document) == ['one', 'two']
@@ -0,0 +1,14 @@
+"""GET /search."""
+import pytest
+
+
+@pytest.mark.parametrize('query', ['', '?keyword=', '?context=10'])
+def test_missing_keyword_is_a_bad_request(app, query):
+    response = app.test_client().get(f'/search{query}')
+    assert response.status_code == 400
+
+
+def test_search_on_empty_corpus(app):
+    response = app.test_client().get('/search?keyword=x')
+    assert response.status_code == 200
+    assert response.get_json() == []
@@ -0,0 +1,34 @@
+"""Background removal of a deleted document's files."""
+import os
+import time
+
+from storage_gc import _remove_document_files
+
+
+def write(path, content=b'x'):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as file:
+        file.write(content)
+    return path
+
+
+def test_removes_files_of_deleted_document(app, tmp_path):
+    file_path = write(str(tmp_path / 'storage' / 'documents' / 'one.pdf'))
+    thumbnail = write(str(tmp_path / 'storage' / 'thumbnails' / 'one' / '1.jpg'))
+
+    _remove_document_files(app, file_path, [thumbnail], time.time())
+
+    assert not os.path.exists(file_path)
+    assert not os.path.exists(os.path.dirname(thumbnail))
+
+
+def test_keeps_files_rewritten_after_the_delete(app, tmp_path):
+    deleted_at = time.time() - 60
+    # The same name was uploaded again while the removal was queued
+    file_path = write(str(tmp_path / 'storage' / 'documents' / 'one.pdf'))
+    thumbnail = write(str(tmp_path / 'storage' / 'thumbnails' / 'one' / '1.jpg'))
+
+    _remove_document_files(app, file_path, [thumbnail], deleted_at)
+
+    assert os.path.exists(file_path)
+    assert os.path.exists(thumbnail)
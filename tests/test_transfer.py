@@ -0,0 +1,102 @@
+"""Corpus import from archives written by (or posing as) export-corpus."""
+import hashlib
+import json
+import os
+import zipfile
+
+import click
+import pytest
+
+from database.transfer import import_corpus
+from models import db, Annotation, Document, Thumbnail
+
+
+def write_archive(path, records, files):
+    with zipfile.ZipFile(path, 'w') as archive:
+        archive.writestr('records.ndjson', "".join(json.dumps(record) + "\n" for record in records))
+        for content in files:
+            archive.writestr(f"files/{hashlib.sha256(content).hexdigest()}", content)
+    return str(path)
+
+
+def ref(content, name):
+    return {"sha256": hashlib.sha256(content).hexdigest(), "name": name}
+
+
+def record(file, pages=(), thumbnails=()):
+    return {
+        "version": 1, "title": "test", "type": "1", "user_email": "admin@example.com",
+        "file": file, "pages": list(pages), "thumbnails": list(thumbnails)
+    }
+
+
+def test_file_names_cannot_leave_storage(app, user, tmp_path):
+    storage = os.path.realpath(tmp_path / 'storage')
+    archive = write_archive(tmp_path / 'corpus.zip', [
+        record(ref(b'one', '../../evil.txt'), thumbnails=[
+            {"page_number": 1, "source_hash": None, "file": ref(b'thumb', '1.jpg')}
+        ]),
+        record(ref(b'two', '..\\..\\evil2.txt')),
+        record(ref(b'three', '..')),
+    ], [b'one', b'two', b'three', b'thumb'])
+
+    stats = import_corpus(archive)
+
+    assert stats["documents"] == 3
+    assert not os.path.exists(tmp_path / 'evil.txt')
+    paths = [document.file_path for document in Document.query.order_by(Document.id)]
+    assert paths == [
+        os.path.join(storage, 'documents', 'evil.txt'),
+        os.path.join(storage, 'documents', 'evil2.txt'),
+        os.path.join(storage, 'documents', hashlib.sha256(b'three').hexdigest()),
+    ]
+    assert Thumbnail.query.one().image_path == os.path.join(storage, 'thumbnails', 'evil', '1.jpg')
+
+
+def test_thumbnail_page_number_must_be_an_integer(app, user, tmp_path):
+    archive = write_archive(tmp_path / 'corpus.zip', [
+        record(ref(b'one', 'one.pdf'), thumbnails=[
+            {"page_number": "../../../evil", "source_hash": None, "file": ref(b'thumb', '1.jpg')}
+        ]),
+    ], [b'one', b'thumb'])
+
+    with pytest.raises(click.ClickException):
+        import_corpus(archive)
+    assert not os.path.exists(tmp_path / 'evil.jpg')
+
+
+def test_existing_documents_are_hashed_before_deduplicating(app, user, tmp_path):
+    # A document stored before file_hash was recorded
+    existing = tmp_path / 'storage' / 'documents' / 'one.pdf'
+    existing.parent.mkdir(parents=True)
+    existing.write_bytes(b'one')
+    db.session.add(Document(title='one.pdf', type='1', file_path=str(existing), user_id=user.id))
+    db.session.commit()
+    archive = write_archive(tmp_path / 'corpus.zip', [record(ref(b'one', 'one.pdf'))], [b'one'])
+
+    stats = import_corpus(archive)
+
+    assert (stats["documents_hashed"], stats["documents"], stats["documents_skipped"]) == (1, 0, 1)
+    assert Document.query.one().file_hash == hashlib.sha256(b'one').hexdigest()
+
+
+def test_documents_without_a_file_keep_their_pages(app, user, tmp_path):
+    pages = [{
+        "page_number": 1, "text": "HAND TRANSCRIPTION", "jp_translation": None, "source_hash": None,
+        "edited": True, "annotations": [{"target_text": "A", "type": "note", "content": "B"}]
+    }]
+    archive = write_archive(
+        tmp_path / 'corpus.zip', [{**record(None, pages), "file_name": "lost.pdf"}], []
+    )
+
+    stats = import_corpus(archive)
+    assert (stats["documents"], stats["documents_missing_file"]) == (1, 1)
+    document = Document.query.one()
+    assert document.file_path == os.path.realpath(tmp_path / 'storage' / 'documents' / 'lost.pdf')
+    assert document.file_hash is None
+    assert [page.text for page in document.pages] == ["HAND TRANSCRIPTION"]
+    assert Annotation.query.one().content == "B"
+
+    # Importing the same archive again adds nothing
+    stats = import_corpus(archive)
+    assert (stats["documents"], stats["documents_skipped"]) == (0, 1)
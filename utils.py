@@ -1,29 +1,117 @@
 import os
-from flask import current_app
-from models import db, Document, Thumbnail
-from werkzeug.utils import secure_filename
-from PIL import Image
-import pytesseract  # Ensure you have Tesseract installed and configured
-import fitz  # PyMuPDF for PDF handling
+import re
+import hashlib
+import logging
+from datetime import datetime
+from config import Config
+from models import db, Document, Page, ProcessingProfile, Thumbnail
+from profiling import stage
 
-pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+# PIL, pytesseract, PyMuPDF and pdf2image are imported inside the ingestion
+# functions so API-only workers never pay for loading them at boot.
+
+TESSERACT_CMD = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+OCR_LANG = 'jpn_vert+chi_tra_vert'
+OCR_DPI = 200
+
+# A PDF page needs at least this many non-whitespace characters in its
+# embedded text layer to skip OCR
+MIN_NATIVE_TEXT_CHARS = 20
+
+THUMBNAIL_DPI = 200
+THUMBNAIL_QUALITY = 10
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.tiff', '.bmp')
+POPPLER_PATH = r"C:\poppler-24.08.0\Library\bin"
+
+# Characters of context kept on each side of a search hit (configured in config.py)
+SNIPPET_CONTEXT_CHARS = Config.SEARCH_CONTEXT_CHARS
+
+logger = logging.getLogger(__name__)
 
 # Define the storage path
 STORAGE_PATH = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'storage')
 
+def _tesseract():
+    """Import and configure pytesseract on first use."""
+    import pytesseract  # Ensure you have Tesseract installed and configured
+    pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
+    return pytesseract
+
 def extract_text(doc_type, file_path):
-    """Extract text from the document based on its type."""
-    if int(doc_type) in [1, 2]:
-        return read_from_file(file_path)
+    """Extract text from the document, one entry per page.
+
+    `doc_type` is kept for existing callers; the native/OCR choice is now
+    made per page by `extract_pages`.
+    """
+    return [page["text"] for page in extract_pages(file_path)]
+
+def extract_pages(file_path, page_numbers=None):
+    """Extract text per page as [{"text", "method"}], method being 'native' or 'ocr'.
+
+    PDF pages with a usable embedded text layer are read directly with PyMuPDF;
+    only image-only pages are rasterized and sent to Tesseract. When
+    `page_numbers` (1-based) is given, only those pages are returned, in order.
+    """
+    lower_path = file_path.lower()
+    if lower_path.endswith('.pdf'):
+        pages = _extract_pdf_pages(file_path, page_numbers)
     else:
-        return OCR_from_file(file_path)
+        if lower_path.endswith('.docx'):
+            pages = [{"text": text, "method": "native"} for text in read_from_file(file_path)]
+        else:
+            pages = [{"text": text, "method": "ocr"} for text in OCR_from_file(file_path)]
+        if page_numbers is not None:
+            pages = [pages[number - 1] for number in page_numbers]
+
+    logger.info(
+        "Extracted %s: %s",
+        os.path.basename(file_path),
+        ", ".join(
+            f"p{number}={page['method']}"
+            for number, page in zip(page_numbers or range(1, len(pages) + 1), pages)
+        )
+    )
+    return pages
+
+def _extract_pdf_pages(file_path, page_numbers=None):
+    """Per-page PDF extraction: embedded text where present, OCR otherwise."""
+    import fitz  # PyMuPDF for PDF handling
+    pages = []
+    with fitz.open(file_path) as doc:
+        numbers = page_numbers or range(1, doc.page_count + 1)
+        for number in numbers:
+            page = doc[number - 1]
+            with stage('extract.text_layer', number):
+                text = page.get_text("text")
+            if has_text_layer(text):
+                # Fix possible vertical text issues
+                pages.append({"text": text.replace("\n", ""), "method": "native"})
+            else:
+                with stage('extract.ocr', number):
+                    pages.append({"text": _ocr_pdf_page(page), "method": "ocr"})
+    return pages
+
+def has_text_layer(text):
+    """Return True if a page's embedded text is substantial and not mis-encoded."""
+    chars = "".join(text.split())
+    if len(chars) < MIN_NATIVE_TEXT_CHARS:
+        return False
+    # Fonts without a usable ToUnicode map come out as U+FFFD or private-use glyphs
+    garbled = sum(1 for c in chars if c == '\ufffd' or '\ue000' <= c <= '\uf8ff')
+    return garbled / len(chars) < 0.1
+
+def _ocr_pdf_page(page):
+    """Rasterize a single PyMuPDF page and OCR it."""
+    from PIL import Image
+    pixmap = page.get_pixmap(dpi=OCR_DPI)
+    image = Image.frombytes("RGB", (pixmap.width, pixmap.height), pixmap.samples)
+    return _tesseract().image_to_string(image, lang=OCR_LANG)
 
 def read_from_file(file_path):
     """Read text from a supported document file and return an array of text."""
-    # Implement logic to read text from .docx or .pdf files
-    # For example, using PyPDF2 for PDFs or python-docx for DOCX
     text_pages = []
     if file_path.endswith('.pdf'):
+        import fitz  # PyMuPDF for PDF handling
         with fitz.open(file_path) as doc:
             for page in doc:
                 text = page.get_text("text")
@@ -31,62 +119,395 @@ def read_from_file(file_path):
                 text = text.replace("\n", "")  # Remove unnecessary line breaks
                 text_pages.append(text)
     elif file_path.endswith('.docx'):
-        from docx import Document
-        doc = Document(file_path)
-        for para in doc.paragraphs:
-            text_pages.append(para.text)
+        with stage('extract.docx'):
+            text_pages = read_docx_pages(file_path)
     return text_pages
 
+W_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+MC_NS = '{http://schemas.openxmlformats.org/markup-compatibility/2006}'
+OFFICE_DOCUMENT_REL = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument'
+
+def read_docx_pages(file_path):
+    """Stream a DOCX body and group its paragraphs into pages.
+
+    Pages are split on explicit breaks (page-type <w:br>, pageBreakBefore,
+    next-page section breaks) and on <w:lastRenderedPageBreak>, where Word
+    recorded a page boundary the last time it laid out the file. Paragraphs
+    inside text boxes follow their host paragraph and never split pages. The
+    XML is read with iterparse and cleared as it goes, so memory stays bounded.
+    """
+    import zipfile
+    from xml.etree.ElementTree import iterparse
+
+    pages = []
+    page_paragraphs = []
+    # Open paragraphs, innermost last: a text box paragraph nests in its host
+    paragraphs = []
+
+    def finish(paragraph):
+        """Lines of a paragraph: its own text, then the paragraphs nested in it."""
+        lines = ["".join(paragraph["text"]), *paragraph["nested"]]
+        paragraph["text"].clear()
+        paragraph["nested"].clear()
+        return lines
+
+    def break_page():
+        if paragraphs and (paragraphs[0]["text"] or paragraphs[0]["nested"]):
+            # Break inside a paragraph: its text so far belongs to this page
+            page_paragraphs.extend(finish(paragraphs[0]))
+        # Explicit and rendered breaks often coincide; never emit empty pages
+        if any(text.strip() for text in page_paragraphs):
+            pages.append("\n".join(page_paragraphs))
+        page_paragraphs.clear()
+
+    with zipfile.ZipFile(file_path) as archive:
+        with archive.open(_docx_main_part(archive)) as xml_file:
+            body = None
+            depth = body_depth = 0
+            # Runs nest through drawings and text boxes, so count them
+            run_depth = fallback_depth = 0
+            in_paragraph_props = break_after_paragraph = False
+            for event, elem in iterparse(xml_file, events=('start', 'end')):
+                tag = elem.tag
+                if event == 'start':
+                    depth += 1
+                    if tag == MC_NS + 'Fallback':
+                        # Legacy copy of the preceding mc:Choice (e.g. a VML text box)
+                        fallback_depth += 1
+                    elif fallback_depth:
+                        pass
+                    elif tag == W_NS + 'body':
+                        body, body_depth = elem, depth
+                    elif tag == W_NS + 'p':
+                        paragraphs.append({"text": [], "nested": []})
+                    elif tag == W_NS + 'r':
+                        run_depth += 1
+                    elif tag == W_NS + 'pPr':
+                        in_paragraph_props = True
+                    elif tag == W_NS + 'lastRenderedPageBreak' and len(paragraphs) == 1:
+                        break_page()
+                    continue
+
+                depth -= 1
+                top_level = len(paragraphs) == 1
+                if tag == MC_NS + 'Fallback':
+                    fallback_depth -= 1
+                elif fallback_depth:
+                    pass
+                elif tag == W_NS + 't':
+                    paragraphs[-1]["text"].append(elem.text or "")
+                elif tag == W_NS + 'r':
+                    run_depth -= 1
+                elif run_depth and tag == W_NS + 'tab':
+                    paragraphs[-1]["text"].append("\t")
+                elif run_depth and tag in (W_NS + 'br', W_NS + 'cr'):
+                    break_type = elem.get(W_NS + 'type')
+                    if break_type == 'page':
+                        if top_level:
+                            break_page()
+                    elif break_type != 'column':
+                        paragraphs[-1]["text"].append("\n")
+                elif tag == W_NS + 'pageBreakBefore':
+                    if top_level and elem.get(W_NS + 'val') not in ('0', 'false', 'off'):
+                        break_page()
+                elif tag == W_NS + 'sectPr' and in_paragraph_props:
+                    if top_level:
+                        section_type = elem.find(W_NS + 'type')
+                        section_type = section_type.get(W_NS + 'val') if section_type is not None else 'nextPage'
+                        break_after_paragraph = section_type != 'continuous'
+                elif tag == W_NS + 'pPr':
+                    in_paragraph_props = False
+                elif tag == W_NS + 'p':
+                    lines = finish(paragraphs.pop())
+                    if paragraphs:
+                        paragraphs[-1]["nested"].extend(lines)
+                    else:
+                        page_paragraphs.extend(lines)
+                        if break_after_paragraph:
+                            break_page()
+                            break_after_paragraph = False
+
+                # Drop each finished top-level block (paragraph/table) from the tree
+                if body is not None and depth == body_depth:
+                    body.clear()
+
+    break_page()
+    return pages
+
+def _docx_main_part(archive):
+    """Locate the main document part via the package relationships."""
+    from xml.etree.ElementTree import fromstring
+    try:
+        rels = fromstring(archive.read('_rels/.rels'))
+    except KeyError:
+        return 'word/document.xml'
+    for rel in rels:
+        if rel.get('Type') == OFFICE_DOCUMENT_REL:
+            return rel.get('Target').lstrip('/')
+    return 'word/document.xml'
+
 def OCR_from_file(file_path):
     """Perform OCR on the document file to extract text."""
     # Use Tesseract to perform OCR on the document
+    pytesseract = _tesseract()
     text_pages = []
     # Convert the document to images first if it's not already an image
     if file_path.endswith('.pdf'):
         from pdf2image import convert_from_path
-        POPPLER_PATH = r"C:\poppler-24.08.0\Library\bin"
-        images = convert_from_path(file_path, dpi=200, poppler_path=POPPLER_PATH)
-        for image in images:
-            text_pages.append(pytesseract.image_to_string(image, lang='jpn_vert+chi_tra_vert'))
+        with stage('ocr.rasterize'):
+            images = convert_from_path(file_path, dpi=OCR_DPI, poppler_path=POPPLER_PATH)
+        for page_number, image in enumerate(images, start=1):
+            with stage('ocr.tesseract', page_number):
+                text_pages.append(pytesseract.image_to_string(image, lang=OCR_LANG))
     else:
         # If it's an image file, directly apply OCR
+        from PIL import Image
         image = Image.open(file_path)
-        text_pages.append(pytesseract.image_to_string(image, lang='jpn_vert+chi_tra_vert'))
+        with stage('ocr.tesseract', 1):
+            text_pages.append(pytesseract.image_to_string(image, lang=OCR_LANG))
     return text_pages
-def process_thumbnails(file_path, document_id):
-    """Process the document file to create thumbnails."""
+
+def process_thumbnails(file_path, document_id, session=None, page_numbers=None, fingerprints=None):
+    """Process the document file to create thumbnails.
+
+    With `page_numbers` only those pages are rendered; existing thumbnail
+    records are updated in place.
+    """
+    session = session or db.session
     # Get the file name without extension
     file_name = os.path.splitext(os.path.basename(file_path))[0]
     thumbnail_dir = os.path.join(STORAGE_PATH, 'thumbnails', file_name)
     os.makedirs(thumbnail_dir, exist_ok=True)
 
+    if fingerprints is None and has_thumbnails(file_path):
+        with stage('fingerprint'):
+            fingerprints = page_fingerprints(file_path)
+    existing = {
+        thumbnail.page_number: thumbnail
+        for thumbnail in session.query(Thumbnail).filter_by(document_id=document_id)
+    }
+
+    for page_number, image in _render_pages(file_path, page_numbers):
+        thumbnail_path = os.path.join(thumbnail_dir, f"{page_number}.jpg")
+        with stage('thumbnail.encode', page_number):
+            image.save(thumbnail_path, 'JPEG', quality=THUMBNAIL_QUALITY)
+        # Create or update the thumbnail record in the database
+        thumbnail = existing.get(page_number)
+        if thumbnail is None:
+            thumbnail = Thumbnail(document_id=document_id, page_number=page_number)
+            session.add(thumbnail)
+        thumbnail.image_path = thumbnail_path
+        thumbnail.source_hash = thumbnail_fingerprint(fingerprints[page_number - 1])
+
+    with stage('thumbnail.db_commit'):
+        session.commit()  # Commit all thumbnail records to the database
+
+def _render_pages(file_path, page_numbers=None):
+    """Yield (page_number, RGB image) for the thumbnail-able pages of a document."""
     # Convert the document to images
     if file_path.endswith('.pdf'):
         from pdf2image import convert_from_path
-        POPPLER_PATH = r"C:\poppler-24.08.0\Library\bin"
-        images = convert_from_path(file_path, dpi=200, poppler_path=POPPLER_PATH)
-        for page_number, image in enumerate(images, start=1):
-            thumbnail_path = os.path.join(thumbnail_dir, f"{page_number}.jpg")
-            image.save(thumbnail_path, 'JPEG', quality=10)
-            # Create a thumbnail record in the database
-            thumbnail = Thumbnail(document_id=document_id, page_number=page_number, image_path=thumbnail_path)
-            db.session.add(thumbnail)
-    elif file_path.lower().endswith(('.png', '.jpg', '.jpeg', '.tiff', '.bmp')):
+        if page_numbers is None:
+            with stage('thumbnail.rasterize'):
+                images = convert_from_path(file_path, dpi=THUMBNAIL_DPI, poppler_path=POPPLER_PATH)
+            yield from enumerate(images, start=1)
+        else:
+            for page_number in page_numbers:
+                with stage('thumbnail.rasterize', page_number):
+                    images = convert_from_path(
+                        file_path, dpi=THUMBNAIL_DPI, poppler_path=POPPLER_PATH,
+                        first_page=page_number, last_page=page_number
+                    )
+                yield page_number, images[0]
+    elif file_path.lower().endswith(IMAGE_EXTENSIONS):
         # Handle image files
         from PIL import Image
-        image = Image.open(file_path)
-        thumbnail_path = os.path.join(thumbnail_dir, "1.jpg")
-        # Convert RGBA to RGB before saving as JPEG
-        if image.mode == 'RGBA':
-            image = image.convert('RGB')
-        image.save(thumbnail_path, 'JPEG', quality=10)
-        # Create a thumbnail record in the database
-        thumbnail = Thumbnail(document_id=document_id, page_number=1, image_path=thumbnail_path)
-        db.session.add(thumbnail)
-
-    db.session.commit()  # Commit all thumbnail records to the database
-
-def search_by_keyword(keyword):
+        with stage('thumbnail.rasterize', 1):
+            image = Image.open(file_path)
+            # Convert RGBA to RGB before saving as JPEG
+            if image.mode == 'RGBA':
+                image = image.convert('RGB')
+            image.load()
+        yield 1, image
+
+def has_thumbnails(file_path):
+    """Whether process_thumbnails renders pages for this file type."""
+    return file_path.endswith('.pdf') or file_path.lower().endswith(IMAGE_EXTENSIONS)
+
+def page_fingerprints(file_path):
+    """Content hash of each source page, independent of processing settings."""
+    lower_path = file_path.lower()
+    if lower_path.endswith('.pdf'):
+        import fitz  # PyMuPDF for PDF handling
+        fingerprints = []
+        with fitz.open(file_path) as doc:
+            for page in doc:
+                # Page geometry, content stream and embedded images (i.e. the scan)
+                digest = hashlib.sha256(f"{tuple(page.rect)}:{page.rotation}".encode())
+                digest.update(page.read_contents())
+                for image in page.get_images(full=True):
+                    digest.update(doc.xref_stream_raw(image[0]) or b"")
+                fingerprints.append(digest.hexdigest())
+        return fingerprints
+    if lower_path.endswith('.docx'):
+        return [hashlib.sha256(text.encode('utf-8')).hexdigest() for text in read_docx_pages(file_path)]
+    return [file_sha256(file_path)]
+
+def file_sha256(file_path):
+    """SHA-256 of a file's contents, read in 1 MiB chunks."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as source:
+        for chunk in iter(lambda: source.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def text_fingerprint(page_fingerprint):
+    """Page fingerprint combined with the settings that affect extracted text."""
+    settings = f"{OCR_LANG}:{OCR_DPI}:{MIN_NATIVE_TEXT_CHARS}"
+    return hashlib.sha256(f"{page_fingerprint}:{settings}".encode()).hexdigest()
+
+def thumbnail_fingerprint(page_fingerprint):
+    """Page fingerprint combined with the settings that affect thumbnails."""
+    settings = f"{THUMBNAIL_DPI}:{THUMBNAIL_QUALITY}"
+    return hashlib.sha256(f"{page_fingerprint}:{settings}".encode()).hexdigest()
+
+def reprocess_document(document, session, override_edits=False, force=False):
+    """Recompute only the pages whose source or processing settings changed.
+
+    Pages edited by hand, including pages with text that was never extracted
+    (written through /doc-edit), keep their text unless `override_edits` is set;
+    `force` ignores stored fingerprints. Returns the affected page numbers,
+    plus the extraction method ('native' or 'ocr') used for each reprocessed page.
+    """
+    with stage('fingerprint'):
+        fingerprints = page_fingerprints(document.file_path)
+    page_count = len(fingerprints)
+    summary = {
+        "page_count": page_count,
+        "text_reprocessed": [],
+        "extraction_methods": {},
+        "edits_preserved": [],
+        "thumbnails_regenerated": [],
+        "pages_removed": []
+    }
+
+    pages = {}
+    for index, page in enumerate(
+        session.query(Page).filter_by(document_id=document.id).order_by(Page.id), start=1
+    ):
+        # Pages stored before page numbers were recorded follow insertion order
+        if page.page_number is None:
+            page.page_number = index
+        # Text stored before extraction was fingerprinted was entered by hand
+        if page.source_hash is None and (page.text or page.jp_translation):
+            page.edited = True
+        pages.setdefault(page.page_number, page)
+
+    stale = []
+    for page_number, fingerprint in enumerate(fingerprints, start=1):
+        page = pages.get(page_number)
+        if page is not None and page.source_hash == text_fingerprint(fingerprint) and not force:
+            continue
+        if page is not None and page.edited and not override_edits:
+            summary["edits_preserved"].append(page_number)
+            continue
+        stale.append(page_number)
+
+    if stale:
+        for page_number, extracted in zip(stale, extract_pages(document.file_path, stale)):
+            page = pages.get(page_number)
+            if page is None:
+                page = Page(document_id=document.id, page_number=page_number)
+                session.add(page)
+            page.text = extracted["text"]
+            page.extraction_method = extracted["method"]
+            summary["extraction_methods"][page_number] = extracted["method"]
+            page.source_hash = text_fingerprint(fingerprints[page_number - 1])
+            page.edited = False
+        summary["text_reprocessed"] = stale
+
+    # The source now has fewer pages
+    for page_number, page in pages.items():
+        if page_number > page_count:
+            if page.edited and not override_edits:
+                summary["edits_preserved"].append(page_number)
+            else:
+                session.delete(page)
+                summary["pages_removed"].append(page_number)
+
+    if has_thumbnails(document.file_path):
+        thumbnails = {
+            thumbnail.page_number: thumbnail
+            for thumbnail in session.query(Thumbnail).filter_by(document_id=document.id)
+        }
+        for page_number, thumbnail in thumbnails.items():
+            if page_number > page_count:
+                if os.path.exists(thumbnail.image_path):
+                    os.remove(thumbnail.image_path)
+                session.delete(thumbnail)
+        changed = [
+            page_number for page_number, fingerprint in enumerate(fingerprints, start=1)
+            if force
+            or page_number not in thumbnails
+            or thumbnails[page_number].source_hash != thumbnail_fingerprint(fingerprint)
+        ]
+        if changed:
+            process_thumbnails(document.file_path, document.id, session, changed, fingerprints)
+        summary["thumbnails_regenerated"] = changed
+
+    with stage('db_commit'):
+        session.commit()
+    return summary
+
+def save_profile(session, document_id, kind, profiler):
+    """Store an ingestion profile (and its stack samples, if taken) for a document."""
+    sample_path = None
+    if profiler.sampler is not None:
+        timestamp = datetime.utcnow().strftime('%Y%m%d%H%M%S')
+        sample_path = os.path.join(STORAGE_PATH, 'profiles', f"{document_id}-{kind}-{timestamp}.folded")
+        profiler.sampler.write(sample_path)
+    profile = ProcessingProfile(
+        document_id=document_id,
+        kind=kind,
+        wall_ms=profiler.wall_ms,
+        stages=profiler.stages,
+        sample_path=sample_path
+    )
+    session.add(profile)
+    return profile
+
+def build_snippet(value, pattern, context_chars=SNIPPET_CONTEXT_CHARS):
+    """Bounded, highlighted snippet of the keyword hits in `value`, or None.
+
+    Hits that fit within 2 * `context_chars` of the first one are merged into
+    a single snippet; `highlights` are [start, end) offsets into `context`.
+    The snippet never exceeds about 4 * `context_chars` plus the keyword,
+    however long `value` is.
+    """
+    if not value:
+        return None
+    spans = []
+    hit_count = 0
+    for match in pattern.finditer(value):
+        hit_count += 1
+        if not spans or match.end() - spans[0][0] <= max(2 * context_chars, match.end() - match.start()):
+            spans.append(match.span())
+    if not spans:
+        return None
+
+    start = max(0, spans[0][0] - context_chars)
+    end = min(len(value), spans[-1][1] + context_chars)
+    prefix = "..." if start > 0 else ""
+    suffix = "..." if end < len(value) else ""
+    offset = len(prefix) - start
+    return {
+        "context": f"{prefix}{value[start:end]}{suffix}",
+        "highlights": [[hit_start + offset, hit_end + offset] for hit_start, hit_end in spans],
+        "hit_count": hit_count
+    }
+
+def search_by_keyword(keyword, context_chars=SNIPPET_CONTEXT_CHARS):
+    pattern = re.compile(re.escape(keyword), re.IGNORECASE)
     documents = Document.query.all()
     search_results = []
     
@@ -106,58 +527,27 @@ def search_by_keyword(keyword):
         # Search in pages
         for page in document.pages:
             page_matches = []
-                    
-            # Search in page text
-            if page.text and keyword.lower() in page.text.lower():
-                start_idx = page.text.lower().find(keyword.lower())
-                context_start = max(0, start_idx - 50)
-                context_end = min(len(page.text), start_idx + len(keyword) + 50)
-                context = page.text[context_start:context_end]
-                page_matches.append({
-                    "type": "text",
-                    "text": keyword,
-                    "context": f"...{context}..."
-                })
-            
-            # Search in Japanese translation
-            if page.jp_translation and keyword.lower() in page.jp_translation.lower():
-                start_idx = page.jp_translation.lower().find(keyword.lower())
-                context_start = max(0, start_idx - 50)
-                context_end = min(len(page.jp_translation), start_idx + len(keyword) + 50)
-                context = page.jp_translation[context_start:context_end]
-                page_matches.append({
-                    "type": "translation",
-                    "text": keyword,
-                    "context": f"...{context}..."
-                })
-            
-            # Search in annotations
-            for i, annotation in enumerate(page.annotations, 1):
-                # Search in annotation name
-                if annotation.target_text and keyword.lower() in annotation.target_text.lower():
-                    page_matches.append({
-                        "type": "annotation_name",
-                        "text": annotation.target_text,
-                        "context": f"{annotation.target_text}"
-                        # "context": f"#{i}: {annotation.target_text}"
-                    })
-                
-                # Search in annotation type
-                if annotation.type and keyword.lower() in annotation.type.lower():
-                    page_matches.append({
-                        "type": "annotation_type", 
-                        "text": annotation.type,
-                        "context": f"{annotation.type}"
-                        # "context": f"#{i}: {annotation.type}"
-                    })
-                
-                # Search in annotation content
-                if annotation.content and keyword.lower() in annotation.content.lower():
+
+            fields = [
+                ("text", page.text),  # Search in page text
+                ("translation", page.jp_translation)  # Search in Japanese translation
+            ]
+            # Search in annotation name, type and content
+            for annotation in page.annotations:
+                fields.extend([
+                    ("annotation_name", annotation.target_text),
+                    ("annotation_type", annotation.type),
+                    ("annotation_content", annotation.content)
+                ])
+
+            for match_type, value in fields:
+                snippet = build_snippet(value, pattern, context_chars)
+                if snippet:
                     page_matches.append({
-                        "type": "annotation_content",
-                        "text": keyword,
-                        "context": f"{annotation.content}"
-                        # "context": f"#{i}: {annotation.content}"
+                        "type": match_type,
+                        # Names and types are short labels; show the (bounded) label itself
+                        "text": snippet["context"] if match_type in ("annotation_name", "annotation_type") else keyword,
+                        **snippet
                     })
             if page_matches:
                 matches["page_matches"].append({
@@ -179,4 +569,4 @@ def search_by_keyword(keyword):
                 "total_matches": total_matches
             })
     
-    return search_results
\ No newline at end of file
+    return search_results
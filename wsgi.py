@@ -0,0 +1,5 @@
+# Production entry point: `python serve.py` (waitress, any OS)
+# or `gunicorn -c gunicorn.conf.py wsgi:app` (Linux, multi-process)
+from app import app
+
+application = app